@@ -0,0 +1,97 @@
+"""Перевірка одночасних покупок через обробник рейсу (PURCHASE_PIPELINE_ENABLED).
+
+Застосунок запускається в процесі на тимчасовій БД, кожен покупець —
+окремий клієнт, що купує своє місце одного рейсу. Перевіряється, що
+жоден запит не впав з помилкою сервера чи тайм-аутом пулу з'єднань і
+що жодне місце не продано двічі. Відмови контролю допуску (503) — це
+очікувана поведінка при перевищенні PURCHASE_MAX_CONCURRENT.
+
+    python bench_purchases.py --buyers 40
+    python bench_purchases.py --buyers 40 --max-concurrent 0   # без ліміту
+"""
+import argparse
+import collections
+import concurrent.futures
+import os
+import sys
+import tempfile
+import time
+
+ALLOWED_STATUSES = {200, 503}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Одночасні покупки через обробник рейсу")
+    parser.add_argument("--buyers", type=int, default=40)
+    parser.add_argument("--max-concurrent", type=int, default=None,
+                        help="ліміт одночасних покупок (0 — без ліміту)")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+
+    # Налаштування мають бути змінені до побудови застосунку
+    from utils import purchase_queue, rate_limit
+    purchase_queue.PURCHASE_PIPELINE_ENABLED = True
+    if args.max_concurrent is not None:
+        rate_limit.PURCHASE_MAX_CONCURRENT = args.max_concurrent or sys.maxsize
+
+    from fastapi.testclient import TestClient
+    import main as app_module
+
+    with TestClient(app_module.app) as client:
+        headers = []
+        for number in range(args.buyers):
+            username = f"buyer{number}"
+            client.post("/auth/register", json={
+                "username": username, "email": f"{username}@example.com", "password": "password"
+            })
+            token = client.post("/auth/login", data={
+                "username": username, "password": "password"
+            }).json()["access_token"]
+            headers.append({"Authorization": f"Bearer {token}"})
+
+        bus = client.post("/buses/", headers=headers[0], json={
+            "registration_number": "BENCH", "model": "bench", "capacity": args.buyers
+        }).json()
+        route = client.post("/routes/", headers=headers[0], json={
+            "name": "bench", "bus_id": bus["id"], "stations": ["A", "B"],
+            "departure_time": "2030-01-01T08:00:00", "arrival_time": "2030-01-01T10:00:00"
+        }).json()
+
+        def buy(number: int):
+            started = time.perf_counter()
+            response = client.post("/tickets/buy", headers=headers[number], json={
+                "route_id": route["id"], "departure_station": "A", "arrival_station": "B",
+                "travel_date": "2030-01-01T08:00:00", "seats": [number + 1]
+            })
+            return response.status_code, time.perf_counter() - started
+
+        started = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(args.buyers) as executor:
+            results = list(executor.map(buy, range(args.buyers)))
+        elapsed = time.perf_counter() - started
+
+        seats = client.get(
+            f"/routes/{route['id']}", params={"travel_date": "2030-01-01T08:00:00"}
+        ).json()["available_seats"]
+
+    statuses = collections.Counter(status_code for status_code, _ in results)
+    sold = statuses.get(200, 0)
+    print(f"покупців: {args.buyers}, статуси: {dict(statuses)}")
+    print(f"загальний час {elapsed:.2f} с, найдовший запит "
+          f"{max(duration for _, duration in results):.2f} с")
+
+    failures = []
+    if set(statuses) - ALLOWED_STATUSES:
+        failures.append("неочікувані статуси відповідей")
+    if args.buyers - len(seats) != sold:
+        failures.append(f"продано місць {args.buyers - len(seats)}, успішних покупок {sold}")
+
+    for failure in failures:
+        print(f"ПОМИЛКА: {failure}")
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Вимірювання часу холодного запуску воркера.
+
+Кожен запуск виконується в окремому процесі: імпорт main (побудова
+застосунку) та проходження lifespan (міграції, відновлення стану).
+Перший запуск на новій БД виконує всі міграції, наступні — лише читають
+версію схеми.
+
+    python bench_startup.py --workers 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+WORKER_CODE = """
+import asyncio, json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+async def boot():
+    async with main.app.router.lifespan_context(main.app):
+        pass
+
+asyncio.run(boot())
+ready = time.perf_counter()
+print(json.dumps({"import_ms": (imported - started) * 1000, "lifespan_ms": (ready - imported) * 1000}))
+"""
+
+
+def run_worker(database_url: str) -> dict:
+    project_dir = os.path.dirname(os.path.abspath(__file__))
+    output = subprocess.run(
+        [sys.executable, "-c", WORKER_CODE],
+        cwd=project_dir,
+        env={**os.environ, "DATABASE_URL": database_url},
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Час холодного запуску воркера")
+    parser.add_argument("--workers", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        results = [run_worker(database_url) for _ in range(args.workers)]
+
+    for number, result in enumerate(results, 1):
+        total = result["import_ms"] + result["lifespan_ms"]
+        print(
+            f"воркер {number}: імпорт {result['import_ms']:.1f} мс, "
+            f"lifespan {result['lifespan_ms']:.1f} мс, всього {total:.1f} мс"
+        )
+
+    warm = results[1:] or results
+    print(f"медіана lifespan після першого запуску: "
+          f"{statistics.median(r['lifespan_ms'] for r in warm):.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,11 @@
+import os
+
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-# Підключення до SQLite БД
-SQLALCHEMY_DATABASE_URL = "sqlite:///./transport_company.db"
+# Підключення до SQLite БД (можна перевизначити змінною середовища DATABASE_URL)
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./transport_company.db")
 
 # Створення двигуна SQLAlchemy
 engine = create_engine(
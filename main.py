@@ -1,43 +1,22 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-import sys
-import os
-
-# Додавання поточної директорії до шляху пошуку Python
-current_dir = os.path.dirname(os.path.abspath(__file__))
-sys.path.insert(0, current_dir)
-
-# Імпорт локальних модулів
-from database import engine, Base
-from routers import auth, buses, routes, tickets
-
-# Створення таблиць в базі даних
-Base.metadata.create_all(bind=engine)
-
-# Створення екземпляру FastAPI
-app = FastAPI(
-    title="API компанії перевізника",
-    description="API для роботи з компанією перевізником. Дозволяє купувати квитки на автобуси.",
-    version="1.0.0",
-)
-
-# Налаштування CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # В продакшен-режимі обмежте конкретними доменами
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Підключення роутерів
-app.include_router(auth.router)
-app.include_router(buses.router)
-app.include_router(routes.router)
-app.include_router(tickets.router)
-
-
-@app.get("/")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Ініціалізація при запуску воркера та збереження стану при зупинці."""
+    from database import engine
+    from utils.migrations import run_migrations
+    from utils.hold_store import restore_holds, persist_holds
+    
+    # Міграції схеми БД (для актуальної схеми — одне читання версії)
+    run_migrations(engine)
+    restore_holds()
+    yield
+    persist_holds()
+
+
 def read_root():
     """Базовий ендпоінт для перевірки працездатності API."""
     return {
@@ -46,7 +25,55 @@ def read_root():
         "redoc": "/redoc"
     }
 
+
+def create_app() -> FastAPI:
+    """Створення екземпляру FastAPI.
+    
+    Імпорт модуля не звертається до БД: роутери імпортуються лише тут, а
+    міграції виконуються в lifespan під час запуску воркера.
+    """
+    from routers import auth, buses, routes, tickets, fares
+    from utils.rate_limit import AdmissionControlMiddleware
+    from utils.profiling import PROFILING_ENABLED, ProfilingMiddleware
+    
+    app = FastAPI(
+        title="API компанії перевізника",
+        description="API для роботи з компанією перевізником. Дозволяє купувати квитки на автобуси.",
+        version="1.0.0",
+        lifespan=lifespan,
+    )
+    
+    # Налаштування CORS
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # В продакшен-режимі обмежте конкретними доменами
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    
+    # Обмеження частоти та кількості одночасних запитів на купівлю
+    app.add_middleware(AdmissionControlMiddleware)
+    
+    # Профілювання окремих запитів (вмикається в utils/profiling.py)
+    if PROFILING_ENABLED:
+        app.add_middleware(ProfilingMiddleware)
+    
+    # Підключення роутерів
+    app.include_router(auth.router)
+    app.include_router(buses.router)
+    app.include_router(routes.router)
+    app.include_router(tickets.router)
+    app.include_router(fares.router)
+    
+    app.get("/")(read_root)
+    
+    return app
+
+
+app = create_app()
+
 # Запуск сервера якщо цей файл запускається напряму
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000)
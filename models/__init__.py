@@ -1,4 +1,7 @@
 from .bus import Bus
 from .client import Client
 from .route import Route
-from .ticket import Ticket, SeatReservation
\ No newline at end of file
+from .ticket import Ticket, SeatReservation, TicketChange
+from .inventory import DepartureInventory
+from .archive import TicketArchive, SeatReservationArchive
+from .fare import RouteFare
\ No newline at end of file
@@ -0,0 +1,37 @@
+from sqlalchemy import Column, Integer, String, DateTime, Boolean
+
+from database import Base
+
+
+class TicketArchive(Base):
+    """Архів квитків на рейси, що вже відбулися."""
+    __tablename__ = "tickets_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    ticket_number = Column(String, unique=True, index=True)
+    client_id = Column(Integer, index=True)
+    route_id = Column(Integer)
+    bus_id = Column(Integer)
+    departure_station = Column(String)
+    arrival_station = Column(String)
+    seat_number = Column(Integer)
+    purchase_date = Column(DateTime)
+    travel_date = Column(DateTime)
+    is_active = Column(Boolean)
+    archived_at = Column(DateTime)  # Час перенесення до архіву
+
+
+class SeatReservationArchive(Base):
+    """Архів прострочених блокувань місць."""
+    __tablename__ = "seat_reservations_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    ticket_id = Column(Integer)
+    bus_id = Column(Integer)
+    route_id = Column(Integer)
+    seat_number = Column(Integer)
+    travel_date = Column(DateTime)
+    reservation_time = Column(DateTime)
+    expiry_time = Column(DateTime)
+    is_active = Column(Boolean)
+    archived_at = Column(DateTime)  # Час перенесення до архіву
@@ -12,6 +12,8 @@ class Bus(Base):
     model = Column(String)
     capacity = Column(Integer)  # кількість місць в автобусі
     is_active = Column(Boolean, default=True)
+    seats_per_row = Column(Integer, default=4)  # кількість місць у ряду
+    aisle_after = Column(Integer, default=2)    # після якого місця в ряду прохід
     
     # Зв'язок з маршрутами та квитками
     routes = relationship("Route", back_populates="bus")
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, Float, ForeignKey, JSON
+
+from database import Base
+
+
+class RouteFare(Base):
+    """Тарифна таблиця маршруту."""
+    __tablename__ = "route_fares"
+
+    route_id = Column(Integer, ForeignKey("routes.id"), primary_key=True)
+    base_price = Column(Float)     # Базова ціна квитка
+    price_per_km = Column(Float)   # Ціна за кілометр
+    leg_distances = Column(JSON)   # Відстані між сусідніми станціями, км
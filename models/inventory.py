@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Boolean, UniqueConstraint
+
+from database import Base
+
+
+class DepartureInventory(Base):
+    """Стан рейсу (маршрут + дата): лічильник проданих місць, заміна автобуса
+    та скасування.
+
+    Кількість заблокованих місць не зберігається: блокування закінчуються
+    самі, тому вона рахується зі сховища блокувань під час читання.
+    """
+    __tablename__ = "departure_inventory"
+    __table_args__ = (UniqueConstraint("route_id", "travel_date"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    route_id = Column(Integer, ForeignKey("routes.id"), index=True)
+    travel_date = Column(DateTime)
+    sold_count = Column(Integer, default=0)  # Кількість активних квитків
+    bus_id = Column(Integer, ForeignKey("buses.id"), nullable=True)  # Автобус на заміну (None — автобус маршруту)
+    is_cancelled = Column(Boolean, default=False)  # Рейс скасовано
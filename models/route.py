@@ -11,7 +11,7 @@ class Route(Base):
     name = Column(String, index=True)
     description = Column(String)
     bus_id = Column(Integer, ForeignKey("buses.id"))
-    departure_time = Column(DateTime)
+    departure_time = Column(DateTime, index=True)
     arrival_time = Column(DateTime)
     stations = Column(JSON)  # Зберігає список станцій маршруту як JSON
     
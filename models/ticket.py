@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean, Index
 from sqlalchemy.orm import relationship
 import uuid
 
@@ -7,6 +7,9 @@ from database import Base
 
 class Ticket(Base):
     __tablename__ = "tickets"
+    __table_args__ = (
+        Index("ix_tickets_departure", "route_id", "travel_date", "is_active"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     ticket_number = Column(String, unique=True, index=True, default=lambda: str(uuid.uuid4()))
@@ -27,6 +30,13 @@ class Ticket(Base):
     
     # Зв'язок з бронюванням місця
     seat_reservation = relationship("SeatReservation", back_populates="ticket", uselist=False)
+    
+    @property
+    def signed_token(self):
+        """Підписаний токен для перевірки квитка без доступу до БД."""
+        from utils.ticket_signing import sign_ticket
+        
+        return sign_ticket(self)
 
 
 class SeatReservation(Base):
@@ -38,9 +48,25 @@ class SeatReservation(Base):
     bus_id = Column(Integer, ForeignKey("buses.id"))
     route_id = Column(Integer, ForeignKey("routes.id"))
     seat_number = Column(Integer)
+    travel_date = Column(DateTime, nullable=True)  # Дата рейсу (None — старі блокування на всі дати)
     reservation_time = Column(DateTime)  # Час початку блокування
     expiry_time = Column(DateTime)       # Час закінчення блокування
     is_active = Column(Boolean, default=True)
     
     # Зв'язок з квитком
-    ticket = relationship("Ticket", back_populates="seat_reservation")
\ No newline at end of file
+    ticket = relationship("Ticket", back_populates="seat_reservation")
+
+
+class TicketChange(Base):
+    """Журнал змін квитків рейсу для синхронізації маніфестів валідаторів."""
+    __tablename__ = "ticket_changes"
+    __table_args__ = (
+        Index("ix_ticket_changes_departure", "route_id", "travel_date", "id"),
+        {"sqlite_autoincrement": True},
+    )
+    
+    id = Column(Integer, primary_key=True)  # Курсор синхронізації, лише зростає
+    ticket_id = Column(Integer, ForeignKey("tickets.id"))
+    route_id = Column(Integer, ForeignKey("routes.id"))
+    travel_date = Column(DateTime)
+    changed_at = Column(DateTime)
@@ -1 +1 @@
-from . import auth, buses, routes, tickets
\ No newline at end of file
+from . import auth, buses, routes, tickets, fares
\ No newline at end of file
@@ -7,8 +7,9 @@ from database import get_db
 from models.client import Client
 from schemas.client import ClientCreate, ClientResponse
 from utils.auth import authenticate_client, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
+from utils.profiling import ProfiledRoute
 
-router = APIRouter(prefix="/auth", tags=["auth"])
+router = APIRouter(prefix="/auth", tags=["auth"], route_class=ProfiledRoute)
 
 
 @router.post("/register", response_model=ClientResponse, status_code=status.HTTP_201_CREATED)
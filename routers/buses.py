@@ -1,15 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
+from datetime import datetime
 
 from database import get_db
 from models.bus import Bus
 from models.route import Route
 from models.ticket import Ticket
-from schemas.bus import BusCreate, BusResponse, BusWithAvailableSeats
+from schemas.bus import BusCreate, BusResponse, BusWithAvailableSeats, BusUtilization
 from utils.auth import get_current_client
+from utils.schedule_index import schedule_index
+from utils.profiling import ProfiledRoute
 
-router = APIRouter(prefix="/buses", tags=["buses"])
+router = APIRouter(prefix="/buses", tags=["buses"], route_class=ProfiledRoute)
 
 
 @router.post("/", response_model=BusResponse, status_code=status.HTTP_201_CREATED)
@@ -32,7 +35,9 @@ def create_bus(
         registration_number=bus.registration_number,
         model=bus.model,
         capacity=bus.capacity,
-        is_active=bus.is_active
+        is_active=bus.is_active,
+        seats_per_row=bus.seats_per_row,
+        aisle_after=bus.aisle_after
     )
     
     db.add(db_bus)
@@ -53,6 +58,36 @@ def get_buses(
     return buses
 
 
+@router.get("/utilization", response_model=List[BusUtilization])
+def get_fleet_utilization(
+    start: datetime,
+    end: datetime,
+    db: Session = Depends(get_db)
+):
+    """Завантаженість активних автобусів маршрутами у вказаному часовому вікні."""
+    if end <= start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Кінець вікна має бути пізніше початку"
+        )
+    
+    buses = db.query(Bus).filter(Bus.is_active == True).all()
+    schedules = schedule_index.schedules(db, [bus.id for bus in buses])
+    window_seconds = (end - start).total_seconds()
+    
+    utilization = []
+    for bus in buses:
+        busy_seconds = schedules[bus.id].busy_seconds(start, end)
+        utilization.append({
+            "bus_id": bus.id,
+            "registration_number": bus.registration_number,
+            "busy_hours": busy_seconds / 3600,
+            "utilization": busy_seconds / window_seconds,
+        })
+    
+    return utilization
+
+
 @router.get("/{bus_id}", response_model=BusResponse)
 def get_bus(
     bus_id: int,
@@ -148,6 +183,8 @@ def update_bus(
     db_bus.model = bus_update.model
     db_bus.capacity = bus_update.capacity
     db_bus.is_active = bus_update.is_active
+    db_bus.seats_per_row = bus_update.seats_per_row
+    db_bus.aisle_after = bus_update.aisle_after
     
     db.commit()
     db.refresh(db_bus)
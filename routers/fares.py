@@ -0,0 +1,88 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+
+from database import get_db
+from models.fare import RouteFare
+from models.route import Route
+from schemas.fare import RouteFareCreate, RouteFareResponse, FareQuoteRequest, FareQuoteResponse
+from utils.auth import get_current_client
+from utils.fares import fare_engine
+from utils.profiling import ProfiledRoute
+
+router = APIRouter(prefix="/fares", tags=["fares"], route_class=ProfiledRoute)
+
+
+@router.put("/{route_id}", response_model=RouteFareResponse)
+def set_route_fare(
+    route_id: int,
+    fare: RouteFareCreate,
+    db: Session = Depends(get_db),
+    current_client = Depends(get_current_client)  # Для адміністративного доступу
+):
+    """Встановлення тарифної таблиці маршруту (тільки для адміністраторів)."""
+    route = db.query(Route).filter(Route.id == route_id).first()
+    if not route:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Маршрут не знайдено"
+        )
+    
+    # Кількість відстаней має відповідати кількості перегонів
+    if len(fare.leg_distances) != len(route.stations) - 1:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Потрібно вказати {len(route.stations) - 1} відстаней між станціями"
+        )
+    
+    db_fare = db.query(RouteFare).filter(RouteFare.route_id == route_id).first()
+    if not db_fare:
+        db_fare = RouteFare(route_id=route_id)
+        db.add(db_fare)
+    
+    db_fare.base_price = fare.base_price
+    db_fare.price_per_km = fare.price_per_km
+    db_fare.leg_distances = fare.leg_distances
+    
+    db.commit()
+    db.refresh(db_fare)
+    
+    # Скидання кешованої матриці цін
+    fare_engine.invalidate(route_id)
+    
+    return db_fare
+
+
+@router.post("/quote", response_model=FareQuoteResponse)
+def quote_fares(
+    request: FareQuoteRequest,
+    db: Session = Depends(get_db)
+):
+    """Розрахунок цін для багатьох поїздок одним запитом."""
+    route_ids = {item.route_id for item in request.items}
+    routes = db.query(Route).filter(Route.id.in_(route_ids)).all()
+    matrices = fare_engine.matrices(db, routes)
+    
+    quotes = []
+    total_price = 0.0
+    for item in request.items:
+        quote = item.model_dump()
+        matrix = matrices.get(item.route_id)
+        
+        if matrix is None:
+            quote["error"] = "Маршрут не знайдено"
+        elif item.departure_station not in matrix.index or item.arrival_station not in matrix.index:
+            quote["error"] = "Вказані станції не належать до маршруту"
+        elif item.seats <= 0:
+            quote["error"] = "Кількість місць має бути додатною"
+        else:
+            price_per_ticket = matrix.price(item.departure_station, item.arrival_station)
+            if price_per_ticket is None:
+                quote["error"] = "Станція відправлення має бути раніше станції прибуття"
+            else:
+                quote["price_per_ticket"] = price_per_ticket
+                quote["total_price"] = price_per_ticket * item.seats
+                total_price += quote["total_price"]
+        
+        quotes.append(quote)
+    
+    return {"quotes": quotes, "total_price": total_price}
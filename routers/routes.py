@@ -1,14 +1,59 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, func, or_
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 
-from database import get_db
-from models import Route, Bus, Ticket
-from schemas.route import RouteCreate, RouteResponse, RouteWithAvailableSeats
+from database import get_db, SessionLocal
+from models import Route, Bus, Ticket, DepartureInventory
+from schemas.route import (
+    RouteCreate,
+    RouteResponse,
+    RouteWithAvailableSeats,
+    RouteWithAvailability,
+    AvailabilityBatchRequest,
+    DepartureAvailability
+)
 from utils.auth import get_current_client
+from utils.fares import fare_engine
+from utils.hold_store import hold_store
+from utils.inventory import departure_bus
+from utils.schedule_index import schedule_index
+from utils.seat_events import seat_event_hub
+from utils.profiling import ProfiledRoute
 
-router = APIRouter(prefix="/routes", tags=["routes"])
+router = APIRouter(prefix="/routes", tags=["routes"], route_class=ProfiledRoute)
+
+
+def _check_route_times(route: RouteCreate):
+    """Перевірка, що прибуття пізніше за відправлення."""
+    if route.arrival_time <= route.departure_time:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Час прибуття має бути пізніше часу відправлення"
+        )
+
+
+def _check_schedule_conflict(schedule, route: RouteCreate):
+    """Перевірка, що автобус не зайнятий іншим маршрутом у цей час."""
+    conflict = schedule.find_overlap(route.departure_time, route.arrival_time)
+    if conflict is not None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Автобус у цей час вже зайнятий маршрутом {conflict}"
+        )
+
+
+def _available_seats(capacity: int, occupied_seats) -> List[int]:
+    """Список вільних місць автобуса за множиною зайнятих."""
+    occupied_seats = set(occupied_seats)
+    return [seat for seat in range(1, capacity + 1) if seat not in occupied_seats]
+
+
+def _naive(value: datetime) -> datetime:
+    """Дата без часового поясу — так її зберігає і порівнює SQLite."""
+    return value.replace(tzinfo=None)
 
 
 @router.post("/", response_model=RouteResponse, status_code=status.HTTP_201_CREATED)
@@ -26,41 +71,329 @@ def create_route(
             detail="Автобус не знайдено"
         )
     
-    # Створення маршруту
-    db_route = Route(
-        name=route.name,
-        description=route.description,
-        bus_id=route.bus_id,
-        departure_time=route.departure_time,
-        arrival_time=route.arrival_time,
-        stations=route.stations
-    )
+    _check_route_times(route)
+    
+    # Перевірка та збереження під блокуванням, щоб розклад не змінився між ними
+    with schedule_index.lock:
+        schedule = schedule_index.schedule(db, route.bus_id)
+        _check_schedule_conflict(schedule, route)
+        
+        # Створення маршруту
+        db_route = Route(
+            name=route.name,
+            description=route.description,
+            bus_id=route.bus_id,
+            departure_time=route.departure_time,
+            arrival_time=route.arrival_time,
+            stations=route.stations
+        )
+        
+        db.add(db_route)
+        db.commit()
+        db.refresh(db_route)
+        
+        schedule.add(db_route.departure_time, db_route.arrival_time, db_route.id)
     
-    db.add(db_route)
-    db.commit()
-    db.refresh(db_route)
+    # Скидання можливої застарілої матриці цін з тим самим ID
+    fare_engine.invalidate(db_route.id)
     
     return db_route
 
 
-@router.get("/", response_model=List[RouteResponse])
+@router.post("/bulk", response_model=List[RouteResponse], status_code=status.HTTP_201_CREATED)
+def create_routes_bulk(
+    routes: List[RouteCreate],
+    db: Session = Depends(get_db),
+    current_client = Depends(get_current_client)  # Для адміністративного доступу
+):
+    """Завантаження розкладу: створення багатьох маршрутів однією транзакцією.
+    
+    Кожен маршрут перевіряється на перетин як з існуючими маршрутами
+    автобуса, так і з попередніми маршрутами цього ж завантаження.
+    """
+    bus_ids = {route.bus_id for route in routes}
+    existing_bus_ids = {bus_id for (bus_id,) in db.query(Bus.id).filter(Bus.id.in_(bus_ids))}
+    
+    missing = sorted(bus_ids - existing_bus_ids)
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Автобуси не знайдено: {missing}"
+        )
+    
+    for route in routes:
+        _check_route_times(route)
+    
+    with schedule_index.lock:
+        schedules = schedule_index.schedules(db, bus_ids)
+        db_routes = []
+        try:
+            for route in routes:
+                schedule = schedules[route.bus_id]
+                _check_schedule_conflict(schedule, route)
+                
+                db_route = Route(
+                    name=route.name,
+                    description=route.description,
+                    bus_id=route.bus_id,
+                    departure_time=route.departure_time,
+                    arrival_time=route.arrival_time,
+                    stations=route.stations
+                )
+                db.add(db_route)
+                db.flush()  # Оновлення ID маршруту
+                schedule.add(route.departure_time, route.arrival_time, db_route.id)
+                db_routes.append(db_route)
+            
+            db.commit()
+        except BaseException:
+            # Розклади вже містять незбережені маршрути — перечитаємо їх з БД
+            db.rollback()
+            for bus_id in bus_ids:
+                schedule_index.invalidate(bus_id)
+            raise
+    
+    for db_route in db_routes:
+        db.refresh(db_route)
+        fare_engine.invalidate(db_route.id)
+    
+    return db_routes
+
+
+@router.get("/", response_model=List[RouteWithAvailability])
 def get_routes(
     skip: int = 0, 
     limit: int = 100, 
+    travel_date: Optional[datetime] = None,
     db: Session = Depends(get_db)
 ):
-    """Отримання списку всіх маршрутів."""
-    routes = db.query(Route).offset(skip).limit(limit).all()
+    """Отримання списку всіх маршрутів.
+    
+    Якщо вказано дату подорожі, до кожного маршруту додаються лічильники
+    проданих і вільних місць з таблиці departure_inventory (з урахуванням
+    заміни автобуса та скасування рейсу) та кількість заблокованих, але ще
+    не проданих місць зі сховища блокувань.
+    """
+    if travel_date is None:
+        routes = db.query(Route).offset(skip).limit(limit).all()
+        return routes
+    
+    rows = db.query(
+        Route, Bus.capacity, DepartureInventory.sold_count, DepartureInventory.is_cancelled
+    ).outerjoin(
+        DepartureInventory,
+        and_(
+            DepartureInventory.route_id == Route.id,
+            DepartureInventory.travel_date == travel_date
+        )
+    ).outerjoin(
+        Bus, Bus.id == func.coalesce(DepartureInventory.bus_id, Route.bus_id)
+    ).offset(skip).limit(limit).all()
+    
+    held = hold_store.held_seats_by_route(db, [route.id for route, *_ in rows], travel_date)
+    
+    # Продані місця перестають бути заблокованими
+    sold_seats = {}
+    if held:
+        for route_id, seat_number in db.query(Ticket.route_id, Ticket.seat_number).filter(
+            Ticket.route_id.in_(list(held)),
+            Ticket.travel_date == travel_date,
+            Ticket.is_active == True
+        ):
+            sold_seats.setdefault(route_id, set()).add(seat_number)
+    
+    routes = []
+    for route, capacity, sold_count, is_cancelled in rows:
+        sold_count = sold_count or 0
+        free_seats = 0 if is_cancelled else max((capacity or 0) - sold_count, 0)
+        routes.append({
+            **route.__dict__,
+            "sold_count": sold_count,
+            "held_count": len(held.get(route.id, set()) - sold_seats.get(route.id, set())),
+            "free_seats": free_seats,
+            "is_sold_out": free_seats == 0,
+            "is_cancelled": bool(is_cancelled),
+        })
+    
     return routes
 
 
+@router.get("/search", response_model=List[RouteWithAvailability])
+def search_routes(
+    departure_from: datetime,
+    departure_to: datetime,
+    departure_station: Optional[str] = None,
+    arrival_station: Optional[str] = None,
+    min_free_seats: int = 0,
+    travel_date: Optional[datetime] = None,
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db)
+):
+    """Пошук рейсів у вікні часу відправлення з кількістю вільних місць.
+    
+    Маршрути, місткість автобусів та кількість активних квитків отримуються
+    одним згрупованим запитом. Якщо дату подорожі не вказано, квитки
+    рахуються на дату відправлення маршруту. Враховується заміна автобуса
+    рейсу, скасовані рейси не повертаються.
+    """
+    ticket_date = travel_date if travel_date is not None else Route.departure_time
+    sold_count = func.count(Ticket.id)
+    
+    query = db.query(Route, Bus.capacity, sold_count).outerjoin(
+        DepartureInventory,
+        and_(
+            DepartureInventory.route_id == Route.id,
+            DepartureInventory.travel_date == ticket_date
+        )
+    ).join(
+        Bus, Bus.id == func.coalesce(DepartureInventory.bus_id, Route.bus_id)
+    ).outerjoin(
+        Ticket,
+        and_(
+            Ticket.route_id == Route.id,
+            Ticket.travel_date == ticket_date,
+            Ticket.is_active == True
+        )
+    ).filter(
+        Route.departure_time >= departure_from,
+        Route.departure_time < departure_to,
+        or_(DepartureInventory.is_cancelled.is_(None), DepartureInventory.is_cancelled == False)
+    ).group_by(Route.id).order_by(Route.departure_time)
+    
+    if min_free_seats > 0:
+        query = query.having(Bus.capacity - sold_count >= min_free_seats)
+    
+    # Фільтр за станціями виконується після запиту, тому пагінація — теж
+    filter_stations = departure_station is not None or arrival_station is not None
+    if not filter_stations:
+        query = query.offset(skip).limit(limit)
+    
+    results = []
+    for route, capacity, sold in query.all():
+        stations = route.stations
+        if departure_station is not None and departure_station not in stations:
+            continue
+        if arrival_station is not None and arrival_station not in stations:
+            continue
+        if departure_station is not None and arrival_station is not None:
+            # Перевірка порядку станцій (відправлення має бути раніше прибуття)
+            if stations.index(departure_station) >= stations.index(arrival_station):
+                continue
+        
+        free_seats = max(capacity - sold, 0)
+        results.append({
+            **route.__dict__,
+            "sold_count": sold,
+            "free_seats": free_seats,
+            "is_sold_out": free_seats == 0,
+        })
+    
+    if filter_stations:
+        results = results[skip:skip + limit]
+    
+    return results
+
+
+@router.post("/availability", response_model=List[DepartureAvailability])
+def get_availability_batch(
+    request: AvailabilityBatchRequest,
+    db: Session = Depends(get_db)
+):
+    """Доступність місць для багатьох рейсів (маршрут + дата) одним запитом.
+    
+    Місткість автобусів маршрутів, заміни автобусів та скасування рейсів і
+    зайняті місця отримуються трьома запитами незалежно від кількості
+    рейсів. Правила ті самі, що й у get_route.
+    """
+    route_ids = {departure.route_id for departure in request.departures}
+    travel_dates = {_naive(departure.travel_date) for departure in request.departures}
+    
+    capacities = dict(db.query(Route.id, Bus.capacity).join(
+        Bus, Bus.id == Route.bus_id
+    ).filter(Route.id.in_(route_ids)).all())
+    
+    missing = sorted(route_ids - set(capacities))
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Маршрути не знайдено: {missing}"
+        )
+    
+    # Місткість автобуса на заміну та скасування окремих рейсів
+    departure_states = {
+        (route_id, travel_date): (capacity, is_cancelled)
+        for route_id, travel_date, capacity, is_cancelled in db.query(
+            DepartureInventory.route_id,
+            DepartureInventory.travel_date,
+            Bus.capacity,
+            DepartureInventory.is_cancelled
+        ).join(
+            Route, Route.id == DepartureInventory.route_id
+        ).join(
+            Bus, Bus.id == func.coalesce(DepartureInventory.bus_id, Route.bus_id)
+        ).filter(
+            DepartureInventory.route_id.in_(route_ids),
+            DepartureInventory.travel_date.in_(travel_dates)
+        )
+    }
+    
+    ticket_filter = (
+        Ticket.route_id.in_(route_ids),
+        Ticket.travel_date.in_(travel_dates),
+        Ticket.is_active == True
+    )
+    occupied = {}
+    if request.include_seats:
+        for route_id, travel_date, seat_number in db.query(
+            Ticket.route_id, Ticket.travel_date, Ticket.seat_number
+        ).filter(*ticket_filter):
+            occupied.setdefault((route_id, travel_date), set()).add(seat_number)
+    else:
+        sold_counts = {
+            (route_id, travel_date): count
+            for route_id, travel_date, count in db.query(
+                Ticket.route_id, Ticket.travel_date, func.count(Ticket.id)
+            ).filter(*ticket_filter).group_by(Ticket.route_id, Ticket.travel_date)
+        }
+    
+    results = []
+    for departure in request.departures:
+        key = (departure.route_id, _naive(departure.travel_date))
+        capacity, is_cancelled = departure_states.get(key, (capacities[departure.route_id], False))
+        
+        if is_cancelled:
+            available_seats = [] if request.include_seats else None
+            free_count = 0
+        elif request.include_seats:
+            available_seats = _available_seats(capacity, occupied.get(key, ()))
+            free_count = len(available_seats)
+        else:
+            available_seats = None
+            free_count = max(capacity - sold_counts.get(key, 0), 0)
+        
+        results.append({
+            "route_id": departure.route_id,
+            "travel_date": departure.travel_date,
+            "capacity": capacity,
+            "free_count": free_count,
+            "available_seats": available_seats,
+            "is_cancelled": bool(is_cancelled),
+        })
+    
+    return results
+
+
 @router.get("/{route_id}", response_model=RouteWithAvailableSeats)
 def get_route(
     route_id: int,
     travel_date: datetime,
     db: Session = Depends(get_db)
 ):
-    """Отримання маршруту по ID з доступними місцями на вказану дату."""
+    """Отримання маршруту по ID з доступними місцями на вказану дату.
+    
+    bus_id у відповіді — автобус цього рейсу з урахуванням заміни.
+    """
     route = db.query(Route).filter(Route.id == route_id).first()
     
     if not route:
@@ -69,8 +402,8 @@ def get_route(
             detail="Маршрут не знайдено"
         )
     
-    # Отримання автобуса
-    bus = db.query(Bus).filter(Bus.id == route.bus_id).first()
+    # Отримання автобуса рейсу
+    bus, is_cancelled = departure_bus(db, route, travel_date)
     
     # Отримання зайнятих місць на цю дату
     occupied_seats = [
@@ -81,17 +414,61 @@ def get_route(
         ).all()
     ]
     
-    # Розрахунок доступних місць
-    all_seats = list(range(1, bus.capacity + 1))
-    available_seats = [seat for seat in all_seats if seat not in occupied_seats]
+    # Розрахунок доступних місць (скасований рейс не продається)
+    available_seats = [] if is_cancelled else _available_seats(bus.capacity, occupied_seats)
     
     # Додавання доступних місць до відповіді
     route_with_seats = {**route.__dict__}
+    route_with_seats["bus_id"] = bus.id
     route_with_seats["available_seats"] = available_seats
+    route_with_seats["is_cancelled"] = is_cancelled
     
     return route_with_seats
 
 
+@router.get("/{route_id}/seats/events")
+def stream_seat_events(
+    route_id: int,
+    travel_date: datetime,
+    db: Session = Depends(get_db)
+):
+    """Підписка на зміни доступності місць рейсу (Server-Sent Events).
+    
+    Спочатку надсилається знімок зайнятих і заблокованих місць, далі —
+    події seat-taken, seat-held та seat-freed.
+    """
+    route = db.query(Route).filter(Route.id == route_id).first()
+    
+    if not route:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Маршрут не знайдено"
+        )
+    
+    def load_snapshot():
+        # Окрема сесія, бо знімок завантажується вже після відправки заголовків
+        snapshot_db = SessionLocal()
+        try:
+            bus, is_cancelled = departure_bus(snapshot_db, route, travel_date)
+            taken = [
+                seat_number for (seat_number,) in snapshot_db.query(Ticket.seat_number).filter(
+                    Ticket.route_id == route_id,
+                    Ticket.travel_date == travel_date,
+                    Ticket.is_active == True
+                )
+            ]
+            holds = hold_store.held_seats(snapshot_db, route_id, travel_date)
+            return (0 if is_cancelled else bus.capacity), taken, holds
+        finally:
+            snapshot_db.close()
+    
+    return StreamingResponse(
+        seat_event_hub.stream(route_id, travel_date, load_snapshot),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+
 @router.get("/by-stations", response_model=List[RouteResponse])
 def get_routes_by_stations(
     departure_station: str,
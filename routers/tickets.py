@@ -1,12 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Header
+from sqlalchemy import and_, func, update
+from sqlalchemy.orm import Session, joinedload
+from typing import List, Optional
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from datetime import datetime, timedelta
-import threading
 import uuid
 
 from database import get_db
 from models.ticket import Ticket, SeatReservation
+from models.archive import TicketArchive
 from models.route import Route
 from models.bus import Bus
 from schemas.ticket import (
@@ -14,14 +16,52 @@ from schemas.ticket import (
     TicketResponse, 
     TicketsBulkResponse,
     SeatReservationCreate,
-    SeatReservationResponse
+    SeatReservationResponse,
+    ManifestResponse,
+    TicketTokenVerify,
+    TicketTokenPayload,
+    Journey,
+    DepartureDisruption,
+    DepartureDisruptionSummary
 )
-from utils.auth import get_current_client
+from utils.auth import get_current_client, get_validator
+from utils.idempotency import idempotency_store
+from utils.inventory import adjust_inventory, departure_bus, set_departure_state
+from utils.fares import fare_engine
+from utils.hold_store import hold_store
+from utils.manifest import record_ticket_changes, build_manifest
+from utils.schedule_index import schedule_index
+from utils.ticket_signing import verify_ticket_token
+from utils.seat_events import seat_event_hub, SEAT_TAKEN, SEAT_HELD, SEAT_FREED
+from utils.seat_allocation import SeatLayout, allocate_seats, occupancy_bitset
+from utils.purchase_queue import (
+    PURCHASE_PIPELINE_ENABLED,
+    PURCHASE_TIMEOUT_SECONDS,
+    purchase_pipeline,
+    seat_lock
+)
+from utils.profiling import ProfiledRoute
+
+router = APIRouter(prefix="/tickets", tags=["tickets"], route_class=ProfiledRoute)
 
-router = APIRouter(prefix="/tickets", tags=["tickets"])
+def _departure_bus(db: Session, route: Route, travel_date: datetime) -> Bus:
+    """Автобус рейсу з урахуванням заміни; скасований рейс не продається."""
+    bus, is_cancelled = departure_bus(db, route, travel_date)
+    if is_cancelled:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Рейс скасовано"
+        )
+    return bus
 
-# Семафор для безпечного доступу до блокування місць
-seat_lock = threading.Lock()
+
+def _check_seat_number(bus: Bus, seat_number: int):
+    """Перевірка чи номер місця в межах кількості місць в автобусі."""
+    if seat_number <= 0 or seat_number > bus.capacity:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Неправильний номер місця. Доступні місця від 1 до {bus.capacity}"
+        )
 
 
 def cancel_reservation(reservation_id: int, db: Session):
@@ -39,9 +79,21 @@ def cancel_reservation(reservation_id: int, db: Session):
 def reserve_seat(
     reservation: SeatReservationCreate,
     db: Session = Depends(get_db),
-    current_client = Depends(get_current_client)
+    current_client = Depends(get_current_client),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
     """Тимчасове блокування місця під час процесу купівлі квитка."""
+    return idempotency_store.run(
+        current_client.id,
+        "reserve-seat",
+        idempotency_key,
+        reservation,
+        lambda: _reserve_seat(reservation, db, current_client.id),
+    )
+
+
+def _reserve_seat(reservation: SeatReservationCreate, db: Session, client_id: int):
+    """Блокування місця без урахування ключа ідемпотентності."""
     # Перевірка існування маршруту
     route = db.query(Route).filter(Route.id == reservation.route_id).first()
     if not route:
@@ -50,23 +102,17 @@ def reserve_seat(
             detail="Маршрут не знайдено"
         )
     
-    # Перевірка існування автобуса
-    bus = db.query(Bus).filter(Bus.id == reservation.bus_id).first()
-    if not bus:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Автобус не знайдено"
-        )
-    
-    # Перевірка чи номер місця в межах кількості місць в автобусі
-    if reservation.seat_number <= 0 or reservation.seat_number > bus.capacity:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Неправильний номер місця. Доступні місця від 1 до {bus.capacity}"
-        )
-    
     # Блокування для безпечного доступу до місць
     with seat_lock:
+        # Перевірка автобуса рейсу (з урахуванням заміни) та номера місця
+        bus = _departure_bus(db, route, reservation.travel_date)
+        if bus is None or bus.id != reservation.bus_id:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Автобус не обслуговує цей рейс"
+            )
+        _check_seat_number(bus, reservation.seat_number)
+        
         # Перевірка чи місце вже заброньоване або зайняте
         existing_ticket = db.query(Ticket).filter(
             Ticket.route_id == reservation.route_id,
@@ -82,39 +128,24 @@ def reserve_seat(
             )
         
         # Перевірка чи місце вже заблоковане
-        existing_reservation = db.query(SeatReservation).filter(
-            SeatReservation.route_id == reservation.route_id,
-            SeatReservation.bus_id == reservation.bus_id,
-            SeatReservation.seat_number == reservation.seat_number,
-            SeatReservation.is_active == True,
-            SeatReservation.expiry_time > datetime.utcnow()
-        ).first()
-        
-        if existing_reservation:
+        if hold_store.find(db, reservation):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Це місце зараз блокується іншим користувачем"
             )
         
-        # Створення блокування місця на 10 хвилин
-        reservation_time = datetime.utcnow()
-        expiry_time = reservation_time + timedelta(minutes=10)
+        # Створення тимчасового блокування місця
+        new_reservation = hold_store.hold(db, reservation, client_id)
         
-        # Створення нового тимчасового блокування
-        new_reservation = SeatReservation(
-            bus_id=reservation.bus_id,
-            route_id=reservation.route_id,
-            seat_number=reservation.seat_number,
-            reservation_time=reservation_time,
-            expiry_time=expiry_time,
-            is_active=True
+        seat_event_hub.publish(
+            reservation.route_id,
+            reservation.travel_date,
+            SEAT_HELD,
+            [reservation.seat_number],
+            new_reservation.expiry_time
         )
         
-        db.add(new_reservation)
-        db.commit()
-        db.refresh(new_reservation)
-        
-        return new_reservation
+        return SeatReservationResponse.model_validate(new_reservation)
 
 
 @router.post("/buy", response_model=TicketsBulkResponse)
@@ -122,9 +153,63 @@ def buy_tickets(
     ticket_data: TicketCreate,
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
-    current_client = Depends(get_current_client)
+    current_client = Depends(get_current_client),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
     """Купівля одного або декількох квитків."""
+    return idempotency_store.run(
+        current_client.id,
+        "buy",
+        idempotency_key,
+        ticket_data,
+        lambda: _buy_tickets(ticket_data, background_tasks, db, current_client),
+    )
+
+
+def _allocate_seats(db: Session, bus: Bus, ticket_data: TicketCreate) -> List[int]:
+    """Автоматичний вибір місць за схемою салону з урахуванням зайнятих і заблокованих."""
+    occupied = [
+        seat_number for (seat_number,) in db.query(Ticket.seat_number).filter(
+            Ticket.route_id == ticket_data.route_id,
+            Ticket.travel_date == ticket_data.travel_date,
+            Ticket.is_active == True
+        )
+    ]
+    occupied.extend(hold_store.held_seats(db, ticket_data.route_id, ticket_data.travel_date))
+    
+    seats = allocate_seats(
+        SeatLayout.for_bus(bus),
+        occupancy_bitset(occupied),
+        ticket_data.seat_count,
+        ticket_data.adjacent
+    )
+    if seats is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Немає {ticket_data.seat_count} вільних місць поруч"
+            if ticket_data.adjacent else "Недостатньо вільних місць"
+        )
+    
+    return seats
+
+
+def _buy_tickets(
+    ticket_data: TicketCreate,
+    background_tasks: BackgroundTasks,
+    db: Session,
+    current_client
+):
+    """Купівля квитків без урахування ключа ідемпотентності.
+    
+    Місця передаються списком seats або підбираються автоматично за
+    seat_count (з adjacent=True — лише суцільним блоком).
+    """
+    if not ticket_data.seats and not ticket_data.seat_count:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Вкажіть номери місць або їх кількість"
+        )
+    
     # Перевірка існування маршруту
     route = db.query(Route).filter(Route.id == ticket_data.route_id).first()
     if not route:
@@ -134,25 +219,53 @@ def buy_tickets(
         )
     
     # Перевірка станцій відправлення та прибуття
-    if ticket_data.departure_station not in route.stations or ticket_data.arrival_station not in route.stations:
+    fares = fare_engine.matrix(db, route)
+    if ticket_data.departure_station not in fares.index or ticket_data.arrival_station not in fares.index:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Вказані станції не належать до маршруту"
         )
     
-    # Перевірка порядку станцій
-    stations = route.stations
-    dep_index = stations.index(ticket_data.departure_station)
-    arr_index = stations.index(ticket_data.arrival_station)
+    # Перевірка порядку станцій та розрахунок ціни квитка
+    price_per_ticket = fares.price(ticket_data.departure_station, ticket_data.arrival_station)
     
-    if dep_index >= arr_index:
+    if price_per_ticket is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Станція відправлення має бути раніше станції прибуття"
         )
     
-    # Отримання автобуса для маршруту
-    bus = db.query(Bus).filter(Bus.id == route.bus_id).first()
+    # Групова фіксація покупок через обробник рейсу; автобус і скасування
+    # рейсу обробник перевіряє сам
+    if PURCHASE_PIPELINE_ENABLED:
+        # З'єднання запиту повертається в пул до очікування обробника: інакше
+        # запити в черзі тримають усі з'єднання, і обробнику не лишається жодного
+        client_id = current_client.id
+        db.close()
+        future = purchase_pipeline.submit(client_id, ticket_data)
+        try:
+            tickets = future.result(timeout=PURCHASE_TIMEOUT_SECONDS)
+        except FutureTimeoutError:
+            # Якщо обробник уже взяв запит, дочікуємось його результату,
+            # інакше запит знімається з черги і не буде виконаний пізніше
+            if not future.cancel():
+                tickets = future.result()
+            else:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Сервіс перевантажений, спробуйте пізніше"
+                )
+        seat_event_hub.publish(
+            ticket_data.route_id,
+            ticket_data.travel_date,
+            SEAT_TAKEN,
+            [ticket.seat_number for ticket in tickets]
+        )
+        
+        return TicketsBulkResponse(
+            tickets=tickets,
+            total_price=price_per_ticket * len(tickets)
+        )
     
     # Перевірка доступності місць
     with seat_lock:
@@ -160,8 +273,17 @@ def buy_tickets(
         reservations_to_cancel = []
         total_price = 0.0  # Базова ціна для квитка
         
+        # Автобус рейсу з урахуванням заміни
+        bus = _departure_bus(db, route, ticket_data.travel_date)
+        
+        seats = ticket_data.seats
+        if not seats:
+            seats = _allocate_seats(db, bus, ticket_data)
+        for seat_number in seats:
+            _check_seat_number(bus, seat_number)
+        
         # Перевірка всіх місць на доступність
-        for seat_number in ticket_data.seats:
+        for seat_number in seats:
             # Перевірка чи місце вже зайняте
             existing_ticket = db.query(Ticket).filter(
                 Ticket.route_id == ticket_data.route_id,
@@ -185,6 +307,7 @@ def buy_tickets(
                 bus_id=bus.id,
                 route_id=ticket_data.route_id,
                 seat_number=seat_number,
+                travel_date=ticket_data.travel_date,
                 reservation_time=datetime.utcnow(),
                 expiry_time=datetime.utcnow() + timedelta(minutes=10),
                 is_active=True
@@ -195,7 +318,7 @@ def buy_tickets(
             reservations_to_cancel.append(reservation.id)
         
         # Створення квитків
-        for seat_number in ticket_data.seats:
+        for seat_number in seats:
             ticket = Ticket(
                 client_id=current_client.id,
                 route_id=ticket_data.route_id,
@@ -211,26 +334,170 @@ def buy_tickets(
             db.add(ticket)
             db.flush()  # Оновлення ID квитка
             purchased_tickets.append(ticket)
-            
-            # Розрахунок ціни (наприклад, на основі відстані між станціями)
-            price_per_ticket = 50.0 + (arr_index - dep_index) * 10.0  # Приклад розрахунку ціни
             total_price += price_per_ticket
         
         # Деактивація всіх блокувань
         for res_id in reservations_to_cancel:
             background_tasks.add_task(cancel_reservation, res_id, db)
         
-        # Збереження змін
+        # Збереження змін разом з лічильником рейсу та журналом змін
+        record_ticket_changes(db, purchased_tickets)
+        adjust_inventory(db, ticket_data.route_id, ticket_data.travel_date, sold=len(purchased_tickets))
         db.commit()
         
+        seat_event_hub.publish(
+            ticket_data.route_id,
+            ticket_data.travel_date,
+            SEAT_TAKEN,
+            seats
+        )
+        
         # Оновлення квитків після збереження
         for ticket in purchased_tickets:
             db.refresh(ticket)
         
-        return {
-            "tickets": purchased_tickets,
-            "total_price": total_price
+        return TicketsBulkResponse(
+            tickets=[TicketResponse.model_validate(ticket) for ticket in purchased_tickets],
+            total_price=total_price
+        )
+
+
+@router.post("/departures/cancel", response_model=DepartureDisruptionSummary)
+def cancel_departure(
+    disruption: DepartureDisruption,
+    db: Session = Depends(get_db),
+    current_client = Depends(get_current_client)  # Для адміністративного доступу
+):
+    """Скасування рейсу або перенесення всіх його квитків на інший автобус.
+    
+    Всі зміни виконуються груповими UPDATE в одній транзакції. При
+    перенесенні пасажири зберігають свої місця, якщо вони є в новому
+    автобусі; решта отримує вільні місця, а тим, кому місць не вистачило,
+    квитки скасовуються. Обмеження на скасування за 24 години не діє.
+    
+    Заміна автобуса або скасування запам'ятовується для рейсу в
+    departure_inventory, тому продаж і доступність місць далі враховують
+    новий автобус, а скасований рейс знімається з продажу. Блокування
+    місць, яких немає в новому автобусі (або всіх місць скасованого
+    рейсу), знімаються.
+    """
+    route_id = disruption.route_id
+    travel_date = disruption.travel_date
+    
+    route = db.query(Route).filter(Route.id == route_id).first()
+    if not route:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Маршрут не знайдено"
+        )
+    
+    capacity = 0
+    if disruption.replacement_bus_id is not None:
+        bus = db.query(Bus).filter(
+            Bus.id == disruption.replacement_bus_id,
+            Bus.is_active == True
+        ).first()
+        if not bus:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Автобус не знайдено"
+            )
+        capacity = bus.capacity
+        
+        # Автобус на заміну не має бути зайнятий іншим маршрутом під час рейсу
+        with schedule_index.lock:
+            conflict = schedule_index.schedule(db, bus.id).find_overlap(
+                travel_date, travel_date + (route.arrival_time - route.departure_time)
+            )
+        if conflict is not None and conflict != route_id:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Автобус у цей час вже зайнятий маршрутом {conflict}"
+            )
+    
+    departure_filter = (
+        Ticket.route_id == route_id,
+        Ticket.travel_date == travel_date,
+        Ticket.is_active == True
+    )
+    
+    with seat_lock:
+        tickets = db.query(
+            Ticket.id, Ticket.route_id, Ticket.travel_date, Ticket.seat_number
+        ).filter(*departure_filter).order_by(Ticket.id).all()
+        
+        # Розподіл квитків за місцями нового автобуса
+        kept_seats = {
+            ticket.seat_number for ticket in tickets
+            if 1 <= ticket.seat_number <= capacity
         }
+        free_seats = iter(seat for seat in range(1, capacity + 1) if seat not in kept_seats)
+        reseated = []
+        cancelled = []
+        for ticket in tickets:
+            if ticket.seat_number in kept_seats:
+                continue
+            new_seat = next(free_seats, None)
+            if new_seat is None:
+                cancelled.append(ticket)
+            else:
+                reseated.append((ticket, new_seat))
+        
+        if kept_seats:
+            db.query(Ticket).filter(
+                *departure_filter,
+                Ticket.seat_number.in_(kept_seats)
+            ).update({Ticket.bus_id: disruption.replacement_bus_id}, synchronize_session=False)
+        
+        if reseated:
+            db.execute(
+                update(Ticket).execution_options(synchronize_session=False),
+                [
+                    {
+                        "id": ticket.id,
+                        "seat_number": new_seat,
+                        "bus_id": disruption.replacement_bus_id
+                    }
+                    for ticket, new_seat in reseated
+                ]
+            )
+        
+        if cancelled:
+            db.query(Ticket).filter(
+                Ticket.id.in_([ticket.id for ticket in cancelled])
+            ).update({Ticket.is_active: False}, synchronize_session=False)
+            adjust_inventory(db, route_id, travel_date, sold=-len(cancelled))
+        
+        set_departure_state(
+            db,
+            route_id,
+            travel_date,
+            bus_id=disruption.replacement_bus_id,
+            is_cancelled=disruption.replacement_bus_id is None
+        )
+        released = hold_store.release_departure(db, route_id, travel_date, capacity)
+        
+        record_ticket_changes(db, tickets)
+        db.commit()
+    
+    # Сповіщення про звільнені та нові зайняті місця
+    freed = released + [ticket.seat_number for ticket in cancelled]
+    freed += [ticket.seat_number for ticket, _ in reseated]
+    taken = [new_seat for _, new_seat in reseated]
+    purchase_pipeline.reload(route_id, travel_date)
+    if freed:
+        seat_event_hub.publish(route_id, travel_date, SEAT_FREED, freed)
+    if taken:
+        seat_event_hub.publish(route_id, travel_date, SEAT_TAKEN, taken)
+    
+    return {
+        "route_id": route_id,
+        "travel_date": travel_date,
+        "replacement_bus_id": disruption.replacement_bus_id,
+        "rebooked": len(kept_seats),
+        "reseated": len(reseated),
+        "cancelled": len(cancelled),
+    }
 
 
 @router.get("/my", response_model=List[TicketResponse])
@@ -249,6 +516,109 @@ def get_my_tickets(
     return tickets
 
 
+@router.get("/my/itinerary", response_model=List[Journey])
+def get_my_itinerary(
+    db: Session = Depends(get_db),
+    current_client = Depends(get_current_client),
+    skip: int = 0,
+    limit: int = 100
+):
+    """Квитки поточного користувача разом з маршрутом та автобусом.
+    
+    Маршрути та автобуси завантажуються тим самим запитом, що й квитки.
+    Квитки однієї поїздки (маршрут, автобус, дата, станції) об'єднуються в
+    одну подорож, навіть якщо їх куплено окремими покупками. `skip` і
+    `limit` рахують подорожі, а не квитки, тож подорож не розривається
+    між сторінками.
+    """
+    journey_key = (
+        Ticket.route_id,
+        Ticket.bus_id,
+        Ticket.travel_date,
+        Ticket.departure_station,
+        Ticket.arrival_station
+    )
+    client_filter = (
+        Ticket.client_id == current_client.id,
+        Ticket.is_active == True
+    )
+    
+    # Сторінка подорожей: ключі поїздок впорядковані за датою та першим квитком
+    first_ticket_id = func.min(Ticket.id).label("first_ticket_id")
+    page = db.query(*journey_key, first_ticket_id).filter(
+        *client_filter
+    ).group_by(*journey_key).order_by(
+        Ticket.travel_date, first_ticket_id
+    ).offset(skip).limit(limit).subquery()
+    
+    tickets = db.query(Ticket).options(
+        joinedload(Ticket.route),
+        joinedload(Ticket.bus)
+    ).join(page, and_(
+        *(column == page.c[column.key] for column in journey_key)
+    )).filter(
+        *client_filter
+    ).order_by(page.c.travel_date, page.c.first_ticket_id, Ticket.id).all()
+    
+    journeys = {}
+    for ticket in tickets:
+        key = (
+            ticket.route_id,
+            ticket.bus_id,
+            ticket.travel_date,
+            ticket.departure_station,
+            ticket.arrival_station
+        )
+        journey = journeys.get(key)
+        if journey is None:
+            journey = journeys[key] = {
+                "route": ticket.route,
+                "bus": ticket.bus,
+                "departure_station": ticket.departure_station,
+                "arrival_station": ticket.arrival_station,
+                "travel_date": ticket.travel_date,
+                "seats": [],
+                "tickets": [],
+            }
+        journey["seats"].append(ticket.seat_number)
+        journey["tickets"].append(ticket)
+    
+    return list(journeys.values())
+
+
+@router.get("/manifest", response_model=ManifestResponse)
+def get_manifest(
+    route_id: int,
+    travel_date: datetime,
+    since: int = 0,
+    db: Session = Depends(get_db),
+    validator = Depends(get_validator)
+):
+    """Маніфест посадки рейсу для пристроїв валідації (заголовок X-Validator-Token).
+    
+    Без параметра `since` повертаються всі квитки рейсу, включно зі
+    скасованими. З `since` — лише квитки, змінені після цього курсора.
+    Отриманий `cursor` передається в наступний запит. Підписані токени
+    до маніфесту не входять: їх пред'являє пасажир, а маніфест лише
+    підтверджує, що квиток не скасовано.
+    """
+    return build_manifest(db, route_id, travel_date, since)
+
+
+@router.post("/verify", response_model=TicketTokenPayload)
+def verify_ticket(token_data: TicketTokenVerify):
+    """Перевірка підписаного токена квитка без звернення до БД."""
+    payload = verify_ticket_token(token_data.token)
+    
+    if payload is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Недійсний токен квитка"
+        )
+    
+    return payload
+
+
 @router.get("/{ticket_id}", response_model=TicketResponse)
 def get_ticket(
     ticket_id: int,
@@ -261,6 +631,13 @@ def get_ticket(
         Ticket.client_id == current_client.id
     ).first()
     
+    # Квитки минулих рейсів шукаємо в архіві
+    if not ticket:
+        ticket = db.query(TicketArchive).filter(
+            TicketArchive.id == ticket_id,
+            TicketArchive.client_id == current_client.id
+        ).first()
+    
     if not ticket:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -299,6 +676,12 @@ def cancel_ticket(
     
     # Скасування квитка
     ticket.is_active = False
+    record_ticket_changes(db, [ticket])
+    adjust_inventory(db, ticket.route_id, ticket.travel_date, sold=-1)
     db.commit()
     
+    # Звільнення місця в обробнику покупок рейсу
+    purchase_pipeline.release(ticket.route_id, ticket.travel_date, [ticket.seat_number])
+    seat_event_hub.publish(ticket.route_id, ticket.travel_date, SEAT_FREED, [ticket.seat_number])
+    
     return None
\ No newline at end of file
@@ -1,11 +1,38 @@
-from .bus import BusBase, BusCreate, BusResponse, BusWithAvailableSeats
+from .bus import BusBase, BusCreate, BusResponse, BusWithAvailableSeats, BusUtilization
 from .client import ClientBase, ClientCreate, ClientResponse, ClientLogin
-from .route import RouteBase, RouteCreate, RouteResponse, RouteWithAvailableSeats
+from .route import (
+    RouteBase,
+    RouteCreate,
+    RouteResponse,
+    RouteWithAvailableSeats,
+    RouteWithAvailability,
+    DepartureKey,
+    AvailabilityBatchRequest,
+    DepartureAvailability
+)
 from .ticket import (
     TicketBase, 
     TicketCreate, 
     TicketResponse, 
     TicketsBulkResponse,
     SeatReservationCreate,
-    SeatReservationResponse
-)
\ No newline at end of file
+    SeatReservationResponse,
+    ManifestEntry,
+    ManifestResponse,
+    TicketTokenVerify,
+    TicketTokenPayload,
+    ItineraryRoute,
+    ItineraryBus,
+    Journey,
+    DepartureDisruption,
+    DepartureDisruptionSummary
+)
+from .fare import (
+    RouteFareBase,
+    RouteFareCreate,
+    RouteFareResponse,
+    FareQuoteItem,
+    FareQuoteRequest,
+    FareQuote,
+    FareQuoteResponse
+)
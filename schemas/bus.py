@@ -7,6 +7,8 @@ class BusBase(BaseModel):
     model: str
     capacity: int
     is_active: Optional[bool] = True
+    seats_per_row: Optional[int] = 4
+    aisle_after: Optional[int] = 2
 
 
 class BusCreate(BusBase):
@@ -22,4 +24,11 @@ class BusResponse(BusBase):
 
 
 class BusWithAvailableSeats(BusResponse):
-    available_seats: List[int]
\ No newline at end of file
+    available_seats: List[int]
+
+
+class BusUtilization(BaseModel):
+    bus_id: int
+    registration_number: str
+    busy_hours: float
+    utilization: float  # Частка часу вікна, коли автобус на маршруті
\ No newline at end of file
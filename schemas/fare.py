@@ -0,0 +1,42 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+
+class RouteFareBase(BaseModel):
+    base_price: float
+    price_per_km: float
+    leg_distances: List[float]
+
+
+class RouteFareCreate(RouteFareBase):
+    pass
+
+
+class RouteFareResponse(RouteFareBase):
+    route_id: int
+    
+    class Config:
+        orm_mode = True
+        from_attributes = True
+
+
+class FareQuoteItem(BaseModel):
+    route_id: int
+    departure_station: str
+    arrival_station: str
+    seats: int = 1
+
+
+class FareQuoteRequest(BaseModel):
+    items: List[FareQuoteItem] = Field(..., max_length=500)
+
+
+class FareQuote(FareQuoteItem):
+    price_per_ticket: Optional[float] = None
+    total_price: Optional[float] = None
+    error: Optional[str] = None
+
+
+class FareQuoteResponse(BaseModel):
+    quotes: List[FareQuote]
+    total_price: float
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
 
@@ -25,4 +25,30 @@ class RouteResponse(RouteBase):
 
 
 class RouteWithAvailableSeats(RouteResponse):
-    available_seats: List[int]
\ No newline at end of file
+    available_seats: List[int]
+    is_cancelled: bool = False
+
+
+class RouteWithAvailability(RouteResponse):
+    sold_count: Optional[int] = None
+    held_count: Optional[int] = None
+    free_seats: Optional[int] = None
+    is_sold_out: Optional[bool] = None
+    is_cancelled: Optional[bool] = None
+
+
+class DepartureKey(BaseModel):
+    route_id: int
+    travel_date: datetime
+
+
+class AvailabilityBatchRequest(BaseModel):
+    departures: List[DepartureKey] = Field(..., max_length=500)
+    include_seats: bool = False
+
+
+class DepartureAvailability(DepartureKey):
+    capacity: int
+    free_count: int
+    available_seats: Optional[List[int]] = None
+    is_cancelled: bool = False
\ No newline at end of file
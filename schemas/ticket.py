@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 from typing import Optional, List
 from datetime import datetime
 
@@ -11,7 +11,16 @@ class TicketBase(BaseModel):
 
 
 class TicketCreate(TicketBase):
-    seats: List[int]  # Список номерів місць для бронювання
+    seats: Optional[List[int]] = None  # Список номерів місць для бронювання
+    seat_count: Optional[int] = Field(None, gt=0)  # Кількість місць для автоматичного вибору
+    adjacent: bool = False             # Чи мають автоматично вибрані місця бути поруч
+    
+    @model_validator(mode="after")
+    def check_seat_selection(self):
+        """Місця задаються або списком, або кількістю — не обома способами."""
+        if self.seats and self.seat_count is not None:
+            raise ValueError("Вкажіть або номери місць, або їх кількість, а не обидва")
+        return self
 
 
 class TicketResponse(TicketBase):
@@ -22,6 +31,7 @@ class TicketResponse(TicketBase):
     seat_number: int
     purchase_date: datetime
     is_active: bool
+    signed_token: Optional[str] = None
     
     class Config:
         orm_mode = True
@@ -51,4 +61,83 @@ class SeatReservationResponse(BaseModel):
     
     class Config:
         orm_mode = True
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class ManifestEntry(BaseModel):
+    ticket_number: str
+    seat_number: int
+    departure_station: str
+    arrival_station: str
+    is_active: bool
+    
+    class Config:
+        orm_mode = True
+        from_attributes = True
+
+
+class ManifestResponse(BaseModel):
+    route_id: int
+    travel_date: datetime
+    cursor: int
+    entries: List[ManifestEntry]
+
+
+class TicketTokenVerify(BaseModel):
+    token: str
+
+
+class TicketTokenPayload(BaseModel):
+    ticket_number: str
+    route_id: int
+    travel_date: datetime
+    seat_number: int
+    departure_station: str
+    arrival_station: str
+
+
+class ItineraryRoute(BaseModel):
+    id: int
+    name: str
+    departure_time: datetime
+    arrival_time: datetime
+    stations: List[str]
+    
+    class Config:
+        orm_mode = True
+        from_attributes = True
+
+
+class ItineraryBus(BaseModel):
+    id: int
+    registration_number: str
+    model: str
+    
+    class Config:
+        orm_mode = True
+        from_attributes = True
+
+
+class Journey(BaseModel):
+    route: ItineraryRoute
+    bus: ItineraryBus
+    departure_station: str
+    arrival_station: str
+    travel_date: datetime
+    seats: List[int]
+    tickets: List[TicketResponse]
+
+
+class DepartureDisruption(BaseModel):
+    route_id: int
+    travel_date: datetime
+    replacement_bus_id: Optional[int] = None  # Якщо не вказано — всі квитки скасовуються
+
+
+class DepartureDisruptionSummary(BaseModel):
+    route_id: int
+    travel_date: datetime
+    replacement_bus_id: Optional[int] = None
+    rebooked: int   # Квитки, перенесені на те саме місце нового автобуса
+    reseated: int   # Квитки, перенесені на інше місце через меншу місткість
+    cancelled: int  # Скасовані квитки
\ No newline at end of file
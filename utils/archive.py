@@ -0,0 +1,132 @@
+from datetime import datetime, timedelta
+import argparse
+
+from sqlalchemy import func, insert, literal, select
+from sqlalchemy.orm import Session
+
+from models.archive import TicketArchive, SeatReservationArchive
+from models.inventory import DepartureInventory
+from models.ticket import Ticket, SeatReservation, TicketChange
+from utils.inventory import adjust_inventory
+
+# Квитки на рейси, старші за цю кількість днів, переносяться до архіву
+ARCHIVE_HORIZON_DAYS = 30
+
+# Кількість квитків або блокувань, що переносяться однією транзакцією
+ARCHIVE_BATCH_SIZE = 1000
+
+
+def _move_rows(db: Session, source, target, ids, archived_at: datetime):
+    """Копіювання рядків до архівної таблиці та видалення з основної."""
+    columns = [column.name for column in source.__table__.columns]
+    db.execute(
+        insert(target.__table__).prefix_with("OR IGNORE").from_select(
+            columns + ["archived_at"],
+            select(*[source.__table__.c[name] for name in columns], literal(archived_at)).where(
+                source.__table__.c.id.in_(ids)
+            )
+        )
+    )
+    db.query(source).filter(source.id.in_(ids)).delete(synchronize_session=False)
+
+
+def _release_departures(db: Session, ticket_ids):
+    """Зменшення лічильників рейсів на активні квитки, що йдуть до архіву.
+
+    Порожні рядки лічильників видаляються, якщо в них не збережено заміну
+    автобуса чи скасування рейсу. Записи журналу змін цих квитків теж
+    видаляються, тож verify_inventory і маніфести не бачать архівованих квитків.
+    """
+    rows = db.query(
+        Ticket.route_id, Ticket.travel_date, func.count(Ticket.id).filter(Ticket.is_active == True)
+    ).filter(
+        Ticket.id.in_(ticket_ids)
+    ).group_by(Ticket.route_id, Ticket.travel_date).all()
+
+    for route_id, travel_date, active_count in rows:
+        if active_count:
+            adjust_inventory(db, route_id, travel_date, sold=-active_count)
+        db.query(DepartureInventory).filter(
+            DepartureInventory.route_id == route_id,
+            DepartureInventory.travel_date == travel_date,
+            DepartureInventory.sold_count <= 0,
+            DepartureInventory.bus_id.is_(None),
+            DepartureInventory.is_cancelled == False
+        ).delete(synchronize_session=False)
+
+    db.query(TicketChange).filter(
+        TicketChange.ticket_id.in_(ticket_ids)
+    ).delete(synchronize_session=False)
+
+
+def archive_past_departures(
+    db: Session,
+    horizon_days: int = ARCHIVE_HORIZON_DAYS,
+    batch_size: int = ARCHIVE_BATCH_SIZE
+) -> dict:
+    """Перенесення квитків та блокувань минулих рейсів до архівних таблиць.
+
+    Кожна порція фіксується окремою транзакцією разом зі зміною
+    лічильників рейсів, тому перерване архівування можна просто запустити
+    знову — воно продовжить з місця зупинки.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=horizon_days)
+    archived = {"tickets": 0, "seat_reservations": 0}
+
+    while True:
+        ticket_ids = [
+            ticket_id for (ticket_id,) in db.query(Ticket.id).filter(
+                Ticket.travel_date < cutoff
+            ).order_by(Ticket.id).limit(batch_size)
+        ]
+        if not ticket_ids:
+            break
+
+        # Блокування посилаються на квитки, тому переносяться першими
+        reservation_ids = [
+            reservation_id for (reservation_id,) in db.query(SeatReservation.id).filter(
+                SeatReservation.ticket_id.in_(ticket_ids)
+            )
+        ]
+        archived_at = datetime.utcnow()
+        _release_departures(db, ticket_ids)
+        if reservation_ids:
+            _move_rows(db, SeatReservation, SeatReservationArchive, reservation_ids, archived_at)
+        _move_rows(db, Ticket, TicketArchive, ticket_ids, archived_at)
+        db.commit()
+
+        archived["tickets"] += len(ticket_ids)
+        archived["seat_reservations"] += len(reservation_ids)
+
+    while True:
+        reservation_ids = [
+            reservation_id for (reservation_id,) in db.query(SeatReservation.id).filter(
+                SeatReservation.expiry_time < cutoff
+            ).order_by(SeatReservation.id).limit(batch_size)
+        ]
+        if not reservation_ids:
+            break
+
+        _move_rows(db, SeatReservation, SeatReservationArchive, reservation_ids, datetime.utcnow())
+        db.commit()
+
+        archived["seat_reservations"] += len(reservation_ids)
+
+    return archived
+
+
+if __name__ == "__main__":
+    from database import SessionLocal, engine
+    from utils.migrations import run_migrations
+
+    parser = argparse.ArgumentParser(description="Архівування квитків минулих рейсів")
+    parser.add_argument("--horizon-days", type=int, default=ARCHIVE_HORIZON_DAYS)
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    run_migrations(engine)
+    db = SessionLocal()
+    try:
+        print(archive_past_departures(db, args.horizon_days, args.batch_size))
+    finally:
+        db.close()
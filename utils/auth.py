@@ -1,8 +1,9 @@
 from datetime import datetime, timedelta
 from typing import Optional
+import hmac
 
 from jose import JWTError, jwt
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 
@@ -14,6 +15,9 @@ SECRET_KEY = "ваш_секретний_ключ"  # В реальному пр
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Токен пристроїв валідації для завантаження маніфестів посадки
+VALIDATOR_TOKEN = "your_validator_token"  # В реальному проекті зберігайте в .env файлі
+
 # Залежність для отримання токену
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
@@ -33,6 +37,16 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
+def get_token_subject(token: str) -> Optional[str]:
+    """Отримання імені користувача з JWT токену без звернення до БД."""
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    
+    return payload.get("sub")
+
+
 def authenticate_client(db: Session, username: str, password: str):
     """Аутентифікація клієнта по логіну та паролю."""
     client = db.query(Client).filter(Client.username == username).first()
@@ -43,7 +57,7 @@ def authenticate_client(db: Session, username: str, password: str):
     return client
 
 
-async def get_current_client(
+def get_current_client(
     token: str = Depends(oauth2_scheme), 
     db: Session = Depends(get_db)
 ):
@@ -71,4 +85,19 @@ async def get_current_client(
     if client is None:
         raise credentials_exception
     
-    return client
\ No newline at end of file
+    # Транзакція читання завершується, щоб запит не тримав з'єднання з пулу,
+    # поки чекає вільного потоку для обробника ендпоінта
+    db.close()
+    
+    return client
+
+
+def get_validator(validator_token: Optional[str] = Header(None, alias="X-Validator-Token")):
+    """Перевірка, що запит надіслав пристрій валідації."""
+    if validator_token is None or not hmac.compare_digest(
+        validator_token.encode("utf-8"), VALIDATOR_TOKEN.encode("utf-8")
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Доступ лише для пристроїв валідації"
+        )
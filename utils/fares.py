@@ -0,0 +1,118 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+import threading
+
+from sqlalchemy.orm import Session
+
+from models.fare import RouteFare
+from models.route import Route
+
+# Тариф за замовчуванням для маршрутів без тарифної таблиці:
+# базова ціна плюс фіксована ціна за кожен перегін між станціями
+DEFAULT_BASE_PRICE = 50.0
+DEFAULT_LEG_PRICE = 10.0
+
+
+class FareMatrix:
+    """Попередньо обчислені ціни для всіх пар станцій маршруту."""
+
+    def __init__(self, stations: List[str], base_price: float, leg_prices: List[float]):
+        self.stations = tuple(stations)
+
+        # Індекс першої появи станції, як у stations.index()
+        self.index: Dict[str, int] = {}
+        for position, station in enumerate(stations):
+            self.index.setdefault(station, position)
+
+        # Накопичена вартість перегонів від першої станції
+        cumulative = [0.0]
+        for leg_price in leg_prices:
+            cumulative.append(cumulative[-1] + leg_price)
+
+        self.prices: Dict[Tuple[str, str], float] = {}
+        for departure, dep_index in self.index.items():
+            for arrival, arr_index in self.index.items():
+                if dep_index < arr_index:
+                    self.prices[(departure, arrival)] = round(
+                        base_price + cumulative[arr_index] - cumulative[dep_index], 2
+                    )
+
+    def price(self, departure_station: str, arrival_station: str) -> Optional[float]:
+        """Ціна квитка між станціями або None, якщо такої поїздки немає."""
+        return self.prices.get((departure_station, arrival_station))
+
+
+def _build_matrix(route: Route, fare: Optional[RouteFare]) -> FareMatrix:
+    legs = max(len(route.stations) - 1, 0)
+
+    if fare is None or not fare.leg_distances or len(fare.leg_distances) != legs:
+        return FareMatrix(route.stations, DEFAULT_BASE_PRICE, [DEFAULT_LEG_PRICE] * legs)
+
+    return FareMatrix(
+        route.stations,
+        fare.base_price,
+        [distance * fare.price_per_km for distance in fare.leg_distances]
+    )
+
+
+class FareEngine:
+    """Кеш матриць цін по маршрутах.
+
+    Матриця будується один раз і скидається через `invalidate` при зміні
+    тарифу або маршруту. Якщо список станцій маршруту змінився, матриця
+    перебудовується автоматично.
+
+    Матриця будується поза блокуванням, тому для кожного маршруту ведеться
+    лічильник скидань: якщо під час побудови матрицю скинули, побудована
+    за старим тарифом матриця не потрапляє в кеш.
+    """
+
+    def __init__(self):
+        self._matrices: Dict[int, FareMatrix] = {}
+        self._generations: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def matrices(self, db: Session, routes: Iterable[Route]) -> Dict[int, FareMatrix]:
+        """Матриці цін для кількох маршрутів; тарифи завантажуються одним запитом."""
+        routes = list(routes)
+        result: Dict[int, FareMatrix] = {}
+        missing: List[Route] = []
+        generations: Dict[int, int] = {}
+
+        with self._lock:
+            for route in routes:
+                matrix = self._matrices.get(route.id)
+                if matrix is not None and matrix.stations == tuple(route.stations):
+                    result[route.id] = matrix
+                else:
+                    missing.append(route)
+                    generations[route.id] = self._generations.get(route.id, 0)
+
+        if missing:
+            fares = {
+                fare.route_id: fare
+                for fare in db.query(RouteFare).filter(
+                    RouteFare.route_id.in_([route.id for route in missing])
+                )
+            }
+            built = {route.id: _build_matrix(route, fares.get(route.id)) for route in missing}
+
+            with self._lock:
+                for route_id, matrix in built.items():
+                    if self._generations.get(route_id, 0) == generations[route_id]:
+                        self._matrices[route_id] = matrix
+            result.update(built)
+
+        return result
+
+    def matrix(self, db: Session, route: Route) -> FareMatrix:
+        """Матриця цін одного маршруту."""
+        return self.matrices(db, [route])[route.id]
+
+    def invalidate(self, route_id: int):
+        """Скидання кешованої матриці маршруту."""
+        with self._lock:
+            self._matrices.pop(route_id, None)
+            self._generations[route_id] = self._generations.get(route_id, 0) + 1
+
+
+fare_engine = FareEngine()
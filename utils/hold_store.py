@@ -0,0 +1,279 @@
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import heapq
+import itertools
+import json
+import os
+import threading
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from models.ticket import SeatReservation
+from schemas.ticket import SeatReservationCreate
+
+# Сховище блокувань місць: "database" (таблиця seat_reservations) або "memory"
+HOLD_STORE_BACKEND = "database"
+
+# Тривалість блокування місця
+HOLD_TTL = timedelta(minutes=10)
+
+# Файл знімка блокувань для відновлення після перезапуску (None — без знімків)
+HOLD_SNAPSHOT_PATH: Optional[str] = None
+
+DATETIME_FIELDS = ("travel_date", "reservation_time", "expiry_time")
+
+
+class Hold:
+    """Блокування місця у сховищі в пам'яті (поля як у SeatReservation)."""
+
+    __slots__ = (
+        "id", "client_id", "bus_id", "route_id", "seat_number", "travel_date",
+        "reservation_time", "expiry_time", "is_active",
+    )
+
+    def __init__(self, id, client_id, bus_id, route_id, seat_number, travel_date,
+                 reservation_time, expiry_time, is_active=True):
+        self.id = id
+        self.client_id = client_id
+        self.bus_id = bus_id
+        self.route_id = route_id
+        self.seat_number = seat_number
+        self.travel_date = travel_date
+        self.reservation_time = reservation_time
+        self.expiry_time = expiry_time
+        self.is_active = is_active
+
+
+def _on_date(travel_date: datetime):
+    """Блокування рейсу; старі блокування без дати діють на всі дати маршруту."""
+    return or_(SeatReservation.travel_date == travel_date, SeatReservation.travel_date.is_(None))
+
+
+class DatabaseHoldStore:
+    """Блокування у таблиці seat_reservations."""
+
+    def find(self, db: Session, reservation: SeatReservationCreate):
+        """Активне блокування місця або None."""
+        return db.query(SeatReservation).filter(
+            SeatReservation.route_id == reservation.route_id,
+            _on_date(reservation.travel_date),
+            SeatReservation.bus_id == reservation.bus_id,
+            SeatReservation.seat_number == reservation.seat_number,
+            SeatReservation.is_active == True,
+            SeatReservation.expiry_time > datetime.utcnow()
+        ).first()
+
+    def hold(self, db: Session, reservation: SeatReservationCreate, client_id: int):
+        """Створення блокування місця."""
+        reservation_time = datetime.utcnow()
+        new_reservation = SeatReservation(
+            bus_id=reservation.bus_id,
+            route_id=reservation.route_id,
+            seat_number=reservation.seat_number,
+            travel_date=reservation.travel_date,
+            reservation_time=reservation_time,
+            expiry_time=reservation_time + HOLD_TTL,
+            is_active=True
+        )
+
+        db.add(new_reservation)
+        db.commit()
+        db.refresh(new_reservation)
+
+        return new_reservation
+
+    def held_seats(self, db: Session, route_id: int, travel_date: datetime) -> Dict[int, datetime]:
+        """Заблоковані місця рейсу та час закінчення блокувань."""
+        return {
+            seat_number: expiry_time
+            for seat_number, expiry_time in db.query(
+                SeatReservation.seat_number, SeatReservation.expiry_time
+            ).filter(
+                SeatReservation.route_id == route_id,
+                _on_date(travel_date),
+                SeatReservation.is_active == True,
+                SeatReservation.expiry_time > datetime.utcnow()
+            )
+        }
+
+    def held_seats_by_route(
+        self, db: Session, route_ids: Iterable[int], travel_date: datetime
+    ) -> Dict[int, Set[int]]:
+        """Заблоковані місця кількох маршрутів на дату одним запитом."""
+        held: Dict[int, Set[int]] = {}
+        for route_id, seat_number in db.query(
+            SeatReservation.route_id, SeatReservation.seat_number
+        ).filter(
+            SeatReservation.route_id.in_(list(route_ids)),
+            _on_date(travel_date),
+            SeatReservation.is_active == True,
+            SeatReservation.expiry_time > datetime.utcnow()
+        ):
+            held.setdefault(route_id, set()).add(seat_number)
+        return held
+
+    def release_departure(
+        self, db: Session, route_id: int, travel_date: datetime, capacity: int = 0
+    ) -> List[int]:
+        """Зняття блокувань рейсу на місцях понад `capacity` (0 — всіх).
+
+        Зміни виконуються в поточній транзакції, фіксує їх викликач.
+        """
+        reservations = db.query(SeatReservation).filter(
+            SeatReservation.route_id == route_id,
+            SeatReservation.travel_date == travel_date,
+            SeatReservation.seat_number > capacity,
+            SeatReservation.is_active == True,
+            SeatReservation.expiry_time > datetime.utcnow()
+        ).all()
+        for reservation in reservations:
+            reservation.is_active = False
+        return [reservation.seat_number for reservation in reservations]
+
+
+class MemoryHoldStore:
+    """Блокування в пам'яті процесу, без записів у БД.
+
+    Кількість заблокованих місць рейсу, як і для DatabaseHoldStore,
+    рахується під час читання через held_seats_by_route.
+
+    Для кожного рейсу (маршрут + дата) зберігається словник
+    місце -> блокування. Прострочені блокування видаляються з купи за
+    часом закінчення при кожному зверненні, тож кожне блокування
+    обробляється один раз. Знімок можна зберегти у файл і завантажити
+    після перезапуску.
+    """
+
+    def __init__(self):
+        self._holds: Dict[Tuple[int, datetime], Dict[int, Hold]] = {}
+        self._expiry_heap: List[tuple] = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _expire(self, now: datetime):
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            _, hold_id, key, seat_number = heapq.heappop(self._expiry_heap)
+            seats = self._holds.get(key)
+            if seats is not None and seats.get(seat_number) is not None \
+                    and seats[seat_number].id == hold_id:
+                del seats[seat_number]
+                if not seats:
+                    del self._holds[key]
+
+    def _add(self, hold: Hold):
+        key = (hold.route_id, hold.travel_date)
+        self._holds.setdefault(key, {})[hold.seat_number] = hold
+        heapq.heappush(self._expiry_heap, (hold.expiry_time, hold.id, key, hold.seat_number))
+
+    def find(self, db: Session, reservation: SeatReservationCreate) -> Optional[Hold]:
+        with self._lock:
+            self._expire(datetime.utcnow())
+            seats = self._holds.get((reservation.route_id, reservation.travel_date), {})
+            return seats.get(reservation.seat_number)
+
+    def hold(self, db: Session, reservation: SeatReservationCreate, client_id: int) -> Hold:
+        reservation_time = datetime.utcnow()
+        with self._lock:
+            hold = Hold(
+                id=next(self._ids),
+                client_id=client_id,
+                bus_id=reservation.bus_id,
+                route_id=reservation.route_id,
+                seat_number=reservation.seat_number,
+                travel_date=reservation.travel_date,
+                reservation_time=reservation_time,
+                expiry_time=reservation_time + HOLD_TTL
+            )
+            self._add(hold)
+            return hold
+
+    def held_seats(self, db: Session, route_id: int, travel_date: datetime) -> Dict[int, datetime]:
+        with self._lock:
+            self._expire(datetime.utcnow())
+            seats = self._holds.get((route_id, travel_date), {})
+            return {seat_number: hold.expiry_time for seat_number, hold in seats.items()}
+
+    def held_seats_by_route(
+        self, db: Session, route_ids: Iterable[int], travel_date: datetime
+    ) -> Dict[int, Set[int]]:
+        with self._lock:
+            self._expire(datetime.utcnow())
+            held: Dict[int, Set[int]] = {}
+            for route_id in route_ids:
+                seats = self._holds.get((route_id, travel_date))
+                if seats:
+                    held[route_id] = set(seats)
+            return held
+
+    def release_departure(
+        self, db: Session, route_id: int, travel_date: datetime, capacity: int = 0
+    ) -> List[int]:
+        with self._lock:
+            self._expire(datetime.utcnow())
+            key = (route_id, travel_date)
+            seats = self._holds.get(key, {})
+            released = [seat_number for seat_number in seats if seat_number > capacity]
+            for seat_number in released:
+                # Запис у купі залишається і буде пропущений при закінченні
+                del seats[seat_number]
+            if not seats:
+                self._holds.pop(key, None)
+            return released
+
+    def save_snapshot(self, path: str):
+        """Збереження активних блокувань у файл."""
+        with self._lock:
+            self._expire(datetime.utcnow())
+            holds = []
+            for seats in self._holds.values():
+                for hold in seats.values():
+                    data = {name: getattr(hold, name) for name in Hold.__slots__}
+                    for name in DATETIME_FIELDS:
+                        data[name] = data[name].isoformat()
+                    holds.append(data)
+
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as snapshot:
+            json.dump(holds, snapshot)
+        os.replace(temporary_path, path)
+
+    def load_snapshot(self, path: str):
+        """Відновлення блокувань з файлу, якщо він існує."""
+        if not os.path.exists(path):
+            return
+
+        with open(path, encoding="utf-8") as snapshot:
+            holds = json.load(snapshot)
+
+        with self._lock:
+            for data in holds:
+                for name in DATETIME_FIELDS:
+                    data[name] = datetime.fromisoformat(data[name])
+                self._add(Hold(**data))
+
+            last_id = max((data["id"] for data in holds), default=0)
+            self._ids = itertools.count(last_id + 1)
+            self._expire(datetime.utcnow())
+
+
+def create_hold_store():
+    """Створення сховища блокувань за налаштуванням HOLD_STORE_BACKEND."""
+    if HOLD_STORE_BACKEND == "memory":
+        return MemoryHoldStore()
+    return DatabaseHoldStore()
+
+
+hold_store = create_hold_store()
+
+
+def restore_holds():
+    """Завантаження знімка блокувань під час запуску застосунку."""
+    if HOLD_SNAPSHOT_PATH and isinstance(hold_store, MemoryHoldStore):
+        hold_store.load_snapshot(HOLD_SNAPSHOT_PATH)
+
+
+def persist_holds():
+    """Збереження знімка блокувань під час зупинки застосунку."""
+    if HOLD_SNAPSHOT_PATH and isinstance(hold_store, MemoryHoldStore):
+        hold_store.save_snapshot(HOLD_SNAPSHOT_PATH)
@@ -0,0 +1,141 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Optional
+import hashlib
+import threading
+
+from fastapi import HTTPException, status
+
+# Налаштування сховища ключів ідемпотентності
+IDEMPOTENCY_TTL_SECONDS = 24 * 60 * 60
+IDEMPOTENCY_MAX_ENTRIES = 10000
+IDEMPOTENCY_WAIT_SECONDS = 30
+
+
+class _Entry:
+    """Запис про запит з ключем ідемпотентності."""
+
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.done = threading.Event()
+        self.response: Any = None
+        self.expires_at: Optional[datetime] = None
+
+
+class IdempotencyStore:
+    """Обмежене сховище відповідей в пам'яті з часом життя записів.
+
+    Ключ складається з ідентифікатора клієнта, назви операції та значення
+    заголовка `Idempotency-Key`. Повторний запит з тим самим ключем отримує
+    збережену відповідь, а паралельні дублікати чекають завершення першого.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int = IDEMPOTENCY_TTL_SECONDS,
+        max_entries: int = IDEMPOTENCY_MAX_ENTRIES,
+    ):
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self, now: datetime):
+        """Видалення прострочених записів та найстаріших понад ліміт.
+
+        Завершені записи переміщуються в кінець, тому впорядковані за часом
+        закінчення: перегляд іде з початку і зупиняється на першому живому
+        записі. Записи, що ще виконуються, не витісняються і пропускаються —
+        їх не більше, ніж паралельних запитів.
+        """
+        excess = len(self._entries) - self.max_entries
+        evicted = []
+        for key, entry in self._entries.items():
+            if entry.expires_at is None:
+                continue
+            if entry.expires_at > now and len(evicted) >= excess:
+                break
+            evicted.append(key)
+
+        for key in evicted:
+            del self._entries[key]
+
+    def run(
+        self,
+        client_id: int,
+        operation: str,
+        key: Optional[str],
+        payload: Any,
+        func: Callable[[], Any],
+    ):
+        """Виконання операції з урахуванням ключа ідемпотентності.
+
+        `func` повинна повертати відповідь, яку можна серіалізувати, бо вона
+        зберігається і віддається повторним запитам без звернення до БД.
+        Помилки не кешуються: після невдалої спроби ключ звільняється.
+        """
+        if not key:
+            return func()
+
+        scope = (client_id, operation, key)
+        fingerprint = hashlib.sha256(
+            payload.model_dump_json().encode("utf-8")
+        ).hexdigest()
+
+        while True:
+            with self._lock:
+                now = datetime.utcnow()
+                entry = self._entries.get(scope)
+                if entry is not None and entry.expires_at is not None and entry.expires_at <= now:
+                    del self._entries[scope]
+                    entry = None
+
+                if entry is None:
+                    entry = _Entry(fingerprint)
+                    self._entries[scope] = entry
+                    self._evict(now)
+                    owner = True
+                else:
+                    owner = False
+
+            if owner:
+                break
+
+            if entry.fingerprint != fingerprint:
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail="Ключ ідемпотентності вже використано з іншими даними запиту"
+                )
+
+            # Очікування завершення першого запиту з цим ключем
+            if not entry.done.wait(IDEMPOTENCY_WAIT_SECONDS):
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="Запит з цим ключем ідемпотентності ще виконується"
+                )
+
+            if entry.response is not None:
+                return entry.response
+            # Перша спроба завершилась помилкою — повторюємо як новий запит
+
+        try:
+            response = func()
+        except BaseException:
+            with self._lock:
+                if self._entries.get(scope) is entry:
+                    del self._entries[scope]
+            entry.done.set()
+            raise
+
+        with self._lock:
+            entry.response = response
+            entry.expires_at = datetime.utcnow() + self.ttl
+            if self._entries.get(scope) is entry:
+                self._entries.move_to_end(scope)
+        entry.done.set()
+
+        return response
+
+
+# Спільне сховище для ендпоінтів купівлі та блокування місць
+idempotency_store = IdempotencyStore()
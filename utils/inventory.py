@@ -0,0 +1,159 @@
+from datetime import datetime
+from typing import List, Optional, Tuple
+import argparse
+
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from models.bus import Bus
+from models.inventory import DepartureInventory
+from models.route import Route
+from models.ticket import Ticket
+
+
+def adjust_inventory(
+    db: Session,
+    route_id: int,
+    travel_date: datetime,
+    sold: int = 0
+):
+    """Зміна лічильника проданих місць рейсу в поточній транзакції.
+
+    Використовується атомарний UPSERT, тому паралельні зміни одного рейсу
+    не перезаписують одна одну.
+    """
+    statement = insert(DepartureInventory).values(
+        route_id=route_id,
+        travel_date=travel_date,
+        sold_count=max(sold, 0)
+    ).on_conflict_do_update(
+        index_elements=["route_id", "travel_date"],
+        set_={"sold_count": DepartureInventory.sold_count + sold}
+    )
+    db.execute(statement)
+
+
+def set_departure_state(
+    db: Session,
+    route_id: int,
+    travel_date: datetime,
+    bus_id: Optional[int] = None,
+    is_cancelled: bool = False
+):
+    """Заміна автобуса або скасування рейсу в поточній транзакції."""
+    statement = insert(DepartureInventory).values(
+        route_id=route_id,
+        travel_date=travel_date,
+        sold_count=0,
+        bus_id=bus_id,
+        is_cancelled=is_cancelled
+    ).on_conflict_do_update(
+        index_elements=["route_id", "travel_date"],
+        set_={"bus_id": bus_id, "is_cancelled": is_cancelled}
+    )
+    db.execute(statement)
+
+
+def departure_bus(db: Session, route: Route, travel_date: datetime) -> Tuple[Bus, bool]:
+    """Автобус рейсу з урахуванням заміни та ознака скасування рейсу."""
+    state = db.query(DepartureInventory.bus_id, DepartureInventory.is_cancelled).filter(
+        DepartureInventory.route_id == route.id,
+        DepartureInventory.travel_date == travel_date
+    ).first()
+
+    bus_id = route.bus_id
+    is_cancelled = False
+    if state is not None:
+        bus_id = state.bus_id or bus_id
+        is_cancelled = bool(state.is_cancelled)
+
+    return db.query(Bus).filter(Bus.id == bus_id).first(), is_cancelled
+
+
+def _actual_sold_counts(db: Session) -> dict:
+    """Фактична кількість активних квитків по рейсах."""
+    rows = db.query(
+        Ticket.route_id, Ticket.travel_date, func.count(Ticket.id)
+    ).filter(
+        Ticket.is_active == True
+    ).group_by(Ticket.route_id, Ticket.travel_date).all()
+
+    return {(route_id, travel_date): count for route_id, travel_date, count in rows}
+
+
+def rebuild_inventory(db: Session, commit: bool = True) -> int:
+    """Повний перерахунок лічильників з таблиці квитків.
+
+    Заміна автобуса та скасування рейсів зберігаються. З commit=False
+    перерахунок лишається в поточній транзакції (використовується міграцією).
+    """
+    sold_counts = _actual_sold_counts(db)
+
+    db.query(DepartureInventory).update(
+        {DepartureInventory.sold_count: 0}, synchronize_session=False
+    )
+    for (route_id, travel_date), count in sold_counts.items():
+        statement = insert(DepartureInventory).values(
+            route_id=route_id,
+            travel_date=travel_date,
+            sold_count=count
+        )
+        db.execute(statement.on_conflict_do_update(
+            index_elements=["route_id", "travel_date"],
+            set_={"sold_count": statement.excluded.sold_count}
+        ))
+
+    db.query(DepartureInventory).filter(
+        DepartureInventory.sold_count == 0,
+        DepartureInventory.bus_id.is_(None),
+        DepartureInventory.is_cancelled == False
+    ).delete(synchronize_session=False)
+    if commit:
+        db.commit()
+
+    return len(sold_counts)
+
+
+def verify_inventory(db: Session) -> List[dict]:
+    """Пошук рейсів, де збережена кількість проданих місць не збігається з фактичною."""
+    actual = _actual_sold_counts(db)
+    stored = {
+        (row.route_id, row.travel_date): row.sold_count
+        for row in db.query(DepartureInventory).all()
+    }
+
+    mismatches = []
+    for key in sorted(set(actual) | set(stored)):
+        if actual.get(key, 0) != stored.get(key, 0):
+            mismatches.append({
+                "route_id": key[0],
+                "travel_date": key[1],
+                "stored": stored.get(key, 0),
+                "actual": actual.get(key, 0),
+            })
+
+    return mismatches
+
+
+if __name__ == "__main__":
+    from database import SessionLocal, engine
+    from utils.migrations import run_migrations
+
+    parser = argparse.ArgumentParser(description="Обслуговування лічильників місць рейсів")
+    parser.add_argument("command", choices=["rebuild", "verify"])
+    args = parser.parse_args()
+
+    run_migrations(engine)
+    db = SessionLocal()
+    try:
+        if args.command == "rebuild":
+            print(f"Перераховано рейсів: {rebuild_inventory(db)}")
+        else:
+            mismatches = verify_inventory(db)
+            for mismatch in mismatches:
+                print(mismatch)
+            print(f"Розбіжностей: {len(mismatches)}")
+            raise SystemExit(1 if mismatches else 0)
+    finally:
+        db.close()
@@ -0,0 +1,56 @@
+from datetime import datetime
+from typing import Iterable
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models.ticket import Ticket, TicketChange
+
+
+def record_ticket_changes(db: Session, tickets: Iterable[Ticket]):
+    """Запис змін квитків у журнал в поточній транзакції.
+    
+    Приймає квитки з уже призначеними ID або рядки запиту з полями
+    id, route_id та travel_date.
+    """
+    changed_at = datetime.utcnow()
+    db.add_all([
+        TicketChange(
+            ticket_id=ticket.id,
+            route_id=ticket.route_id,
+            travel_date=ticket.travel_date,
+            changed_at=changed_at
+        )
+        for ticket in tickets
+    ])
+
+
+def build_manifest(db: Session, route_id: int, travel_date: datetime, since: int = 0) -> dict:
+    """Маніфест рейсу: всі квитки або лише змінені після курсора `since`.
+
+    Курсор фіксується до читання квитків, тому зміна, що відбулася під час
+    побудови маніфесту, буде повторно передана наступною синхронізацією.
+    """
+    departure_filter = (
+        TicketChange.route_id == route_id,
+        TicketChange.travel_date == travel_date,
+    )
+    cursor = db.query(func.max(TicketChange.id)).filter(*departure_filter).scalar() or 0
+
+    query = db.query(Ticket).filter(
+        Ticket.route_id == route_id,
+        Ticket.travel_date == travel_date
+    )
+    if since:
+        changed_ids = db.query(TicketChange.ticket_id).filter(
+            *departure_filter,
+            TicketChange.id > since
+        )
+        query = query.filter(Ticket.id.in_(changed_ids))
+
+    return {
+        "route_id": route_id,
+        "travel_date": travel_date,
+        "cursor": cursor,
+        "entries": query.order_by(Ticket.seat_number).all(),
+    }
@@ -0,0 +1,144 @@
+from typing import Callable, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from database import Base
+
+
+def _create_tables(connection: Connection):
+    """Створення відсутніх таблиць за моделями (існуючі таблиці не змінюються)."""
+    import models  # noqa: F401 — реєстрація всіх моделей у Base.metadata
+
+    Base.metadata.create_all(bind=connection)
+
+
+def _column_exists(connection: Connection, table: str, column: str) -> bool:
+    rows = connection.exec_driver_sql(f"PRAGMA table_info({table})").fetchall()
+    return any(row[1] == column for row in rows)
+
+
+def _add_column(table: str, column: str, definition: str) -> Callable[[Connection], None]:
+    """Міграція додавання стовпця; пропускається, якщо стовпець вже створено моделлю."""
+    def migrate(connection: Connection):
+        if not _column_exists(connection, table, column):
+            connection.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    return migrate
+
+
+def _rebuild_inventory(connection: Connection):
+    """Заповнення лічильників місць рейсів з уже проданих квитків."""
+    from utils.inventory import rebuild_inventory
+
+    # Сесія приєднується до транзакції міграцій і не фіксує її сама
+    db = Session(bind=connection)
+    try:
+        rebuild_inventory(db, commit=False)
+    finally:
+        db.close()
+
+
+def _execute(statement: str) -> Callable[[Connection], None]:
+    def migrate(connection: Connection):
+        connection.exec_driver_sql(statement)
+    return migrate
+
+
+# Список міграцій: (версія, опис, функція). Нові міграції додаються в кінець.
+# Нова таблиця моделі створюється міграцією з _create_tables, новий стовпець
+# існуючої таблиці — міграцією з _add_column.
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "Початкова схема", _create_tables),
+    (2, "Індекс часу відправлення маршрутів", _execute(
+        "CREATE INDEX IF NOT EXISTS ix_routes_departure_time ON routes (departure_time)"
+    )),
+    (3, "Індекс квитків за рейсом", _execute(
+        "CREATE INDEX IF NOT EXISTS ix_tickets_departure ON tickets (route_id, travel_date, is_active)"
+    )),
+    (4, "Кількість місць у ряду автобуса", _add_column("buses", "seats_per_row", "INTEGER DEFAULT 4")),
+    (5, "Положення проходу в салоні автобуса", _add_column("buses", "aisle_after", "INTEGER DEFAULT 2")),
+    (6, "Автобус на заміну для рейсу", _add_column("departure_inventory", "bus_id", "INTEGER REFERENCES buses (id)")),
+    (7, "Скасування рейсу", _add_column("departure_inventory", "is_cancelled", "BOOLEAN DEFAULT 0")),
+    (8, "Дата рейсу блокування місця", _add_column("seat_reservations", "travel_date", "DATETIME")),
+    (9, "Дата рейсу в архіві блокувань", _add_column("seat_reservations_archive", "travel_date", "DATETIME")),
+    (10, "Лічильники місць рейсів за проданими квитками", _rebuild_inventory),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+# Скільки воркер чекає, поки інший воркер виконує міграції (мілісекунди)
+MIGRATION_LOCK_TIMEOUT_MS = 60000
+
+
+def get_schema_version(connection: Connection) -> int:
+    """Поточна версія схеми БД (0 — міграції ще не виконувались)."""
+    exists = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'"
+    ).scalar()
+    if not exists:
+        return 0
+    version = connection.exec_driver_sql("SELECT version FROM schema_version").scalar()
+    return version or 0
+
+
+def _apply_migrations(connection: Connection) -> List[int]:
+    """Виконання нових міграцій під ексклюзивним блокуванням БД.
+
+    Версія читається повторно вже під блокуванням: воркер, що дочекався
+    іншого, бачить актуальну схему і нічого не виконує.
+    """
+    connection.exec_driver_sql("BEGIN EXCLUSIVE")
+    try:
+        connection.exec_driver_sql(
+            "CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)"
+        )
+        version = get_schema_version(connection)
+
+        applied = []
+        for migration_version, _, migrate in MIGRATIONS:
+            if migration_version > version:
+                migrate(connection)
+                applied.append(migration_version)
+
+        if applied:
+            connection.execute(text("DELETE FROM schema_version"))
+            connection.execute(
+                text("INSERT INTO schema_version (version) VALUES (:version)"),
+                {"version": applied[-1]}
+            )
+        connection.commit()
+    except BaseException:
+        connection.rollback()
+        raise
+
+    return applied
+
+
+def run_migrations(engine: Engine) -> List[int]:
+    """Виконання міграцій, новіших за версію схеми БД.
+
+    Якщо схема актуальна, виконується лише читання одного рядка версії.
+    Інакше БД блокується через BEGIN EXCLUSIVE і всі нові міграції разом з
+    оновленням версії виконуються в цій одній транзакції (DDL у SQLite
+    транзакційний). Воркери, що запускаються одночасно, чекають на
+    блокування до MIGRATION_LOCK_TIMEOUT_MS, тож міграції виконує лише один.
+    """
+    with engine.connect() as connection:
+        busy_timeout = connection.exec_driver_sql("PRAGMA busy_timeout").scalar()
+        connection.exec_driver_sql(f"PRAGMA busy_timeout = {MIGRATION_LOCK_TIMEOUT_MS}")
+        try:
+            if get_schema_version(connection) >= LATEST_VERSION:
+                return []
+            return _apply_migrations(connection)
+        finally:
+            # З'єднання повертається до пулу зі звичайним часом очікування
+            connection.exec_driver_sql(f"PRAGMA busy_timeout = {busy_timeout}")
+
+
+if __name__ == "__main__":
+    from database import engine
+
+    applied = run_migrations(engine)
+    print(f"Виконано міграцій: {applied}" if applied else "Схема БД актуальна")
@@ -0,0 +1,151 @@
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Optional, Set
+import functools
+import inspect
+import os
+import random
+import sys
+import threading
+
+from fastapi import Request
+from fastapi.routing import APIRoute
+from starlette.middleware.base import BaseHTTPMiddleware
+
+# Профілювання запитів; при вимкненому профілюванні middleware не додається
+PROFILING_ENABLED = False
+
+# Запит профілюється, якщо заголовок X-Profile-Token збігається з цим значенням
+PROFILING_TOKEN = "your_profiling_token"  # В реальному проекті зберігайте в .env файлі
+
+# Частка запитів, що профілюються без заголовка (0 — лише за заголовком)
+PROFILING_SAMPLE_RATE = 0.0
+
+# Інтервал між знімками стеків (секунди)
+PROFILING_INTERVAL = 0.001
+
+# Каталог профілів і максимальна кількість файлів у ньому
+PROFILING_DIR = "profiles"
+PROFILING_MAX_FILES = 50
+
+# Профайлер поточного запиту; копіюється в потоки, де виконуються обробники
+_active_sampler: ContextVar[Optional["StackSampler"]] = ContextVar("active_sampler", default=None)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}.{code.co_name}:{frame.f_lineno}"
+
+
+class StackSampler(threading.Thread):
+    """Статистичний профайлер: періодично знімає стеки потоків запиту.
+
+    Знімаються лише потоки, зареєстровані обробниками цього запиту (див.
+    ProfiledRoute), тож паралельні запити та простої циклу подій не
+    потрапляють у профіль. Очікування `seat_lock` видно як рядок
+    `with seat_lock` в обробнику, час SQLAlchemy, Pydantic та bcrypt — як
+    відповідні кадри під ним.
+    """
+
+    def __init__(self, interval: float = PROFILING_INTERVAL):
+        super().__init__(name="request-profiler", daemon=True)
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.thread_ids: Set[int] = set()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in list(self.thread_ids):
+                frame = frames.get(thread_id)
+
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+
+                if stack:
+                    self.samples[";".join(reversed(stack))] += 1
+
+    def stop(self) -> Counter:
+        self._stopped.set()
+        self.join()
+        return self.samples
+
+
+def _track_thread(endpoint):
+    """Обгортка обробника, що реєструє його потік у профайлері запиту."""
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        sampler = _active_sampler.get()
+        if sampler is None:
+            return endpoint(*args, **kwargs)
+
+        thread_id = threading.get_ident()
+        sampler.thread_ids.add(thread_id)
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            sampler.thread_ids.discard(thread_id)
+
+    wrapper.profiled = True
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """Маршрут, синхронний обробник якого профілюється у своєму потоці.
+
+    Без PROFILING_ENABLED обробник не обгортається.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        if PROFILING_ENABLED and not inspect.iscoroutinefunction(endpoint) \
+                and not getattr(endpoint, "profiled", False):
+            endpoint = _track_thread(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+def _write_profile(samples: Counter, request: Request) -> str:
+    """Збереження профілю у форматі folded stacks (flamegraph.pl, speedscope)."""
+    os.makedirs(PROFILING_DIR, exist_ok=True)
+
+    path_label = request.url.path.strip("/").replace("/", "_") or "root"
+    name = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{request.method}-{path_label}.folded"
+    with open(os.path.join(PROFILING_DIR, name), "w", encoding="utf-8") as profile:
+        for stack, count in samples.most_common():
+            profile.write(f"{stack} {count}\n")
+
+    # Кільцевий буфер: видалення найстаріших профілів понад ліміт
+    profiles = sorted(
+        entry for entry in os.listdir(PROFILING_DIR) if entry.endswith(".folded")
+    )
+    for old_profile in profiles[:-PROFILING_MAX_FILES]:
+        os.remove(os.path.join(PROFILING_DIR, old_profile))
+
+    return name
+
+
+class ProfilingMiddleware(BaseHTTPMiddleware):
+    """Профілювання окремих запитів за заголовком або з заданою ймовірністю."""
+
+    async def dispatch(self, request: Request, call_next):
+        requested = request.headers.get("X-Profile-Token") == PROFILING_TOKEN
+        sampled = PROFILING_SAMPLE_RATE > 0 and random.random() < PROFILING_SAMPLE_RATE
+
+        if not (requested or sampled):
+            return await call_next(request)
+
+        sampler = StackSampler()
+        sampler.start()
+        token = _active_sampler.set(sampler)
+        try:
+            response = await call_next(request)
+        finally:
+            _active_sampler.reset(token)
+            samples = sampler.stop()
+
+        response.headers["X-Profile-Id"] = _write_profile(samples, request)
+        return response
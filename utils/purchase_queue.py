@@ -0,0 +1,312 @@
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+import queue
+import threading
+import time
+
+from fastapi import HTTPException, status
+
+from database import SessionLocal
+from models.route import Route
+from models.ticket import Ticket
+from schemas.ticket import TicketCreate, TicketResponse
+from utils.hold_store import hold_store
+from utils.inventory import adjust_inventory, departure_bus
+from utils.manifest import record_ticket_changes
+from utils.seat_allocation import SeatLayout, allocate_seats, occupancy_bitset
+
+# Увімкнення групової фіксації покупок для гарячих рейсів
+PURCHASE_PIPELINE_ENABLED = False
+
+# Скільки чекати на інші покупки перед фіксацією пакета
+BATCH_WINDOW_SECONDS = 0.005
+MAX_BATCH_SIZE = 256
+
+# Через скільки секунд без запитів обробник рейсу зупиняється
+WORKER_IDLE_SECONDS = 30
+
+# Скільки запит чекає на результат обробника
+PURCHASE_TIMEOUT_SECONDS = 30
+
+# Блокування місць рейсів: купівля без обробника, блокування і скасування
+# рейсу виконуються під ним, обробник рейсу — лише фіксацію пакета
+seat_lock = threading.Lock()
+
+
+class PurchaseRequest:
+    """Запит на купівлю, поставлений у чергу обробника рейсу."""
+
+    def __init__(self, client_id: int, ticket_data: TicketCreate):
+        self.client_id = client_id
+        self.ticket_data = ticket_data
+        self.future: Future = Future()
+
+    def reject(self, detail: str):
+        self.future.set_exception(HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=detail
+        ))
+
+
+class _Release:
+    """Повідомлення про звільнення місць (наприклад, після скасування квитка)."""
+
+    def __init__(self, seats: List[int]):
+        self.seats = seats
+
+
+class _Reload:
+    """Повідомлення про масову зміну місць рейсу: стан треба перечитати з БД."""
+
+
+class DepartureWorker(threading.Thread):
+    """Обробник покупок для одного рейсу (route_id, travel_date).
+
+    Тримає зайняті місця в пам'яті, перевіряє за ними запити з черги і
+    фіксує всі прийняті покупки пакета однією транзакцією. Перед фіксацією
+    стан рейсу звіряється з БД під seat_lock.
+    """
+
+    def __init__(self, pipeline: "PurchasePipeline", route_id: int, travel_date: datetime):
+        super().__init__(name=f"purchase-{route_id}-{travel_date:%Y%m%d%H%M}", daemon=True)
+        self.pipeline = pipeline
+        self.route_id = route_id
+        self.travel_date = travel_date
+        self.queue: "queue.Queue" = queue.Queue()
+        self.occupied: Optional[Set[int]] = None
+
+    def run(self):
+        while True:
+            try:
+                first = self.queue.get(timeout=WORKER_IDLE_SECONDS)
+            except queue.Empty:
+                if self.pipeline._retire(self):
+                    return
+                continue
+
+            batch = [first]
+            deadline = time.monotonic() + BATCH_WINDOW_SECONDS
+            while len(batch) < MAX_BATCH_SIZE:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            self._process(batch)
+
+    def _load_occupied(self, db) -> Set[int]:
+        return {
+            seat_number for (seat_number,) in db.query(Ticket.seat_number).filter(
+                Ticket.route_id == self.route_id,
+                Ticket.travel_date == self.travel_date,
+                Ticket.is_active == True
+            )
+        }
+
+    def _load_departure(self, db):
+        """Автобус рейсу з урахуванням заміни та ознака скасування."""
+        route = db.query(Route).filter(Route.id == self.route_id).first()
+        return departure_bus(db, route, self.travel_date)
+
+    def _allocate(
+        self, item: PurchaseRequest, layout: SeatLayout, taken: Set[int], held: Set[int]
+    ) -> Tuple[Optional[List[int]], Optional[str]]:
+        """Автоматичний вибір місць за станом у пам'яті з урахуванням місць пакета.
+
+        Заблоковані місця вважаються зайнятими, як і в купівлі без обробника.
+        """
+        seats = allocate_seats(
+            layout,
+            occupancy_bitset(self.occupied | taken | held),
+            item.ticket_data.seat_count,
+            item.ticket_data.adjacent
+        )
+        if seats is None:
+            return None, (
+                f"Немає {item.ticket_data.seat_count} вільних місць поруч"
+                if item.ticket_data.adjacent else "Недостатньо вільних місць"
+            )
+        return seats, None
+
+    def _accept(self, db, requests: List[PurchaseRequest], bus, is_cancelled: bool):
+        """Перевірка запитів пакета за станом рейсу в пам'яті.
+
+        Повертає прийняті запити з їхніми квитками (додані в сесію), зайняті
+        ними місця та відхилені запити з причиною.
+        """
+        accepted: List[Tuple[PurchaseRequest, List[Ticket]]] = []
+        rejected: List[Tuple[PurchaseRequest, str]] = []
+        taken: Set[int] = set()
+        layout = SeatLayout.for_bus(bus)
+        held: Optional[Set[int]] = None
+
+        for item in requests:
+            if is_cancelled:
+                rejected.append((item, "Рейс скасовано"))
+                continue
+
+            seats = item.ticket_data.seats
+            if not seats:
+                # Заблоковані місця читаються один раз на пакет
+                if held is None:
+                    held = set(hold_store.held_seats(db, self.route_id, self.travel_date))
+                seats, detail = self._allocate(item, layout, taken, held)
+                if seats is None:
+                    rejected.append((item, detail))
+                    continue
+            elif any(seat_number <= 0 or seat_number > bus.capacity for seat_number in seats):
+                rejected.append((item, f"Неправильний номер місця. Доступні місця від 1 до {bus.capacity}"))
+                continue
+
+            # Перевірка місць за станом у пам'яті
+            requested: Set[int] = set()
+            conflict = None
+            for seat_number in seats:
+                if seat_number in self.occupied or seat_number in taken or seat_number in requested:
+                    conflict = seat_number
+                    break
+                requested.add(seat_number)
+
+            if conflict is not None:
+                rejected.append((item, f"Місце {conflict} вже зайняте"))
+                continue
+
+            tickets = [
+                Ticket(
+                    client_id=item.client_id,
+                    route_id=self.route_id,
+                    bus_id=bus.id,
+                    departure_station=item.ticket_data.departure_station,
+                    arrival_station=item.ticket_data.arrival_station,
+                    seat_number=seat_number,
+                    purchase_date=datetime.utcnow(),
+                    travel_date=self.travel_date,
+                    is_active=True
+                )
+                for seat_number in seats
+            ]
+            db.add_all(tickets)
+            taken.update(requested)
+            accepted.append((item, tickets))
+
+        return accepted, taken, rejected
+
+    def _process(self, batch: list):
+        db = SessionLocal()
+        requests: List[PurchaseRequest] = []
+        rejected: List[Tuple[PurchaseRequest, str]] = []
+        try:
+            if self.occupied is None:
+                self.occupied = self._load_occupied(db)
+
+            for item in batch:
+                if isinstance(item, _Release):
+                    self.occupied.difference_update(item.seats)
+                elif isinstance(item, _Reload):
+                    self.occupied = self._load_occupied(db)
+                # Запит, скасований після тайм-ауту очікування, не виконується
+                elif item.future.set_running_or_notify_cancel():
+                    requests.append(item)
+
+            bus, is_cancelled = self._load_departure(db)
+            accepted, taken, rejected = self._accept(db, requests, bus, is_cancelled)
+
+            if accepted:
+                # Скасування рейсу змінює його місця й автобус під seat_lock, і
+                # повідомлення про це може прийти вже після перевірки пакета.
+                # Тому перед фіксацією стан перечитується з БД під тим самим
+                # блокуванням; якщо він змінився, пакет перевіряється заново
+                with seat_lock:
+                    occupied = self._load_occupied(db)
+                    current_bus, current_cancelled = self._load_departure(db)
+                    if (occupied != self.occupied or current_bus.id != bus.id
+                            or current_cancelled != is_cancelled):
+                        for _, tickets in accepted:
+                            for ticket in tickets:
+                                db.expunge(ticket)
+                        self.occupied = occupied
+                        accepted, taken, rejected = self._accept(
+                            db, requests, current_bus, current_cancelled
+                        )
+
+                    if accepted:
+                        # Одна фіксація на весь пакет разом з лічильником рейсу
+                        adjust_inventory(db, self.route_id, self.travel_date, sold=len(taken))
+                        db.flush()
+                        record_ticket_changes(db, [ticket for _, tickets in accepted for ticket in tickets])
+                        results = [
+                            (item, [TicketResponse.model_validate(ticket) for ticket in tickets])
+                            for item, tickets in accepted
+                        ]
+                        db.commit()
+        except Exception as exc:
+            db.rollback()
+            # Стан у пам'яті могла зіпсувати помилка — перечитаємо його з БД
+            self.occupied = None
+            for item in requests:
+                if not item.future.done():
+                    item.future.set_exception(exc)
+            return
+        finally:
+            db.close()
+
+        for item, detail in rejected:
+            item.reject(detail)
+        if not accepted:
+            return
+
+        self.occupied.update(taken)
+        for item, tickets in results:
+            item.future.set_result(tickets)
+
+
+class PurchasePipeline:
+    """Реєстр обробників покупок по рейсах."""
+
+    def __init__(self):
+        self._workers: Dict[tuple, DepartureWorker] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, client_id: int, ticket_data: TicketCreate) -> Future:
+        """Постановка покупки в чергу обробника рейсу."""
+        request = PurchaseRequest(client_id, ticket_data)
+        key = (ticket_data.route_id, ticket_data.travel_date)
+
+        with self._lock:
+            worker = self._workers.get(key)
+            if worker is None:
+                worker = DepartureWorker(self, *key)
+                self._workers[key] = worker
+                worker.start()
+            worker.queue.put(request)
+
+        return request.future
+
+    def release(self, route_id: int, travel_date: datetime, seats: List[int]):
+        """Повідомлення обробника рейсу про звільнені місця."""
+        with self._lock:
+            worker = self._workers.get((route_id, travel_date))
+            if worker is not None:
+                worker.queue.put(_Release(seats))
+
+    def reload(self, route_id: int, travel_date: datetime):
+        """Повідомлення обробника рейсу, що його місця змінились у БД."""
+        with self._lock:
+            worker = self._workers.get((route_id, travel_date))
+            if worker is not None:
+                worker.queue.put(_Reload())
+
+    def _retire(self, worker: DepartureWorker) -> bool:
+        """Зупинка обробника, якщо в його черзі немає запитів."""
+        with self._lock:
+            if not worker.queue.empty():
+                return False
+            del self._workers[(worker.route_id, worker.travel_date)]
+            return True
+
+
+purchase_pipeline = PurchasePipeline()
@@ -0,0 +1,136 @@
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import math
+import time
+
+from fastapi import Request, status
+from fastapi.responses import JSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from utils.auth import get_token_subject
+
+# Ліміти для ендпоінтів купівлі: (метод, шлях) -> (токенів за секунду, розмір відра)
+RATE_LIMITS: Dict[Tuple[str, str], Tuple[float, int]] = {
+    ("POST", "/tickets/buy"): (1.0, 5),
+    ("POST", "/tickets/reserve-seat"): (2.0, 10),
+}
+
+# Максимальна кількість одночасних запитів на купівлю
+PURCHASE_MAX_CONCURRENT = 16
+
+# Максимальна кількість відер в пам'яті
+MAX_BUCKETS = 100000
+
+
+class TokenBucket:
+    """Відро токенів для одного клієнта на одному ендпоінті."""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated_at")
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+
+    def consume(self) -> float:
+        """Спроба взяти токен. Повертає 0 або кількість секунд до наступного токена."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+
+        return (1 - self.tokens) / self.rate
+
+
+def _client_key(request: Request) -> str:
+    """Визначення клієнта за JWT токеном або, якщо його немає, за IP-адресою."""
+    authorization = request.headers.get("Authorization", "")
+    scheme, _, token = authorization.partition(" ")
+
+    if scheme.lower() == "bearer" and token:
+        subject = get_token_subject(token)
+        if subject is not None:
+            return f"user:{subject}"
+
+    host = request.client.host if request.client else "unknown"
+    return f"ip:{host}"
+
+
+def _reject(status_code: int, detail: str, retry_after: float) -> JSONResponse:
+    return JSONResponse(
+        status_code=status_code,
+        content={"detail": detail},
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class AdmissionControlMiddleware(BaseHTTPMiddleware):
+    """Обмеження частоти запитів та кількості одночасних покупок.
+
+    Відра токенів зберігаються окремо для кожної пари (клієнт, ендпоінт),
+    тому агресивний клієнт вичерпує лише власний ліміт. Глобальний ліміт
+    одночасних запитів не дає черзі на `seat_lock` рости без обмежень.
+    Обробка виконується в потоці циклу подій, тож стан не потребує блокувань.
+    """
+
+    def __init__(
+        self,
+        app,
+        limits: Optional[Dict[Tuple[str, str], Tuple[float, int]]] = None,
+        max_concurrent: Optional[int] = None,
+        max_buckets: int = MAX_BUCKETS,
+    ):
+        super().__init__(app)
+        self.limits = RATE_LIMITS if limits is None else limits
+        self.max_concurrent = PURCHASE_MAX_CONCURRENT if max_concurrent is None else max_concurrent
+        self.max_buckets = max_buckets
+        self.in_flight = 0
+        self._buckets: "OrderedDict[tuple, TokenBucket]" = OrderedDict()
+
+    def _bucket(self, key: tuple, rate: float, capacity: int) -> TokenBucket:
+        bucket = self._buckets.get(key)
+
+        if bucket is None:
+            bucket = TokenBucket(rate, capacity)
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+
+        return bucket
+
+    async def dispatch(self, request: Request, call_next):
+        endpoint = (request.method, request.url.path)
+        limit = self.limits.get(endpoint)
+
+        if limit is None:
+            return await call_next(request)
+
+        # Перевірка ліміту частоти для клієнта
+        rate, capacity = limit
+        retry_after = self._bucket((_client_key(request),) + endpoint, rate, capacity).consume()
+        if retry_after:
+            return _reject(
+                status.HTTP_429_TOO_MANY_REQUESTS,
+                "Забагато запитів, спробуйте пізніше",
+                retry_after,
+            )
+
+        # Перевірка глобального ліміту одночасних покупок
+        if self.in_flight >= self.max_concurrent:
+            return _reject(
+                status.HTTP_503_SERVICE_UNAVAILABLE,
+                "Сервіс перевантажений, спробуйте пізніше",
+                1,
+            )
+
+        self.in_flight += 1
+        try:
+            return await call_next(request)
+        finally:
+            self.in_flight -= 1
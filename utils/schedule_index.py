@@ -0,0 +1,133 @@
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+import threading
+
+from sqlalchemy.orm import Session
+
+from models.route import Route
+
+
+class BusSchedule:
+    """Відсортовані за часом відправлення інтервали маршрутів одного автобуса.
+
+    Для кожного префікса зберігається інтервал з найпізнішим прибуттям,
+    тому перевірка перетину займає O(log n): серед маршрутів, що
+    відправляються до кінця нового інтервалу, достатньо перевірити той,
+    що прибуває найпізніше.
+    """
+
+    def __init__(self):
+        self.starts: List[datetime] = []
+        self.ends: List[datetime] = []
+        self.route_ids: List[int] = []
+        self._max_end_index: List[int] = []
+        # Накопичена тривалість маршрутів у секундах (довжина n + 1)
+        self._cumulative: List[float] = [0.0]
+        # Чи не перетинаються інтервали (старі дані могли бути додані без перевірки)
+        self.disjoint = True
+
+    def find_overlap(self, start: datetime, end: datetime) -> Optional[int]:
+        """ID маршруту, що перетинається з інтервалом [start, end), або None."""
+        count = bisect_left(self.starts, end)
+        if count == 0:
+            return None
+
+        index = self._max_end_index[count - 1]
+        if self.ends[index] > start:
+            return self.route_ids[index]
+
+        return None
+
+    def add(self, start: datetime, end: datetime, route_id: int):
+        """Додавання інтервалу маршруту."""
+        if self.find_overlap(start, end) is not None:
+            self.disjoint = False
+
+        position = bisect_right(self.starts, start)
+        self.starts.insert(position, start)
+        self.ends.insert(position, end)
+        self.route_ids.insert(position, route_id)
+        self._max_end_index.insert(position, position)
+
+        # Оновлення префіксних максимумів починаючи з нової позиції
+        for index in range(position, len(self.starts)):
+            best = index
+            if index > 0:
+                previous = self._max_end_index[index - 1]
+                if self.ends[previous] >= self.ends[index]:
+                    best = previous
+            self._max_end_index[index] = best
+
+        del self._cumulative[position + 1:]
+        for index in range(position, len(self.starts)):
+            duration = (self.ends[index] - self.starts[index]).total_seconds()
+            self._cumulative.append(self._cumulative[index] + duration)
+
+    def busy_seconds(self, window_start: datetime, window_end: datetime) -> float:
+        """Кількість секунд у вікні, коли автобус зайнятий маршрутами."""
+        last = bisect_left(self.starts, window_end)
+
+        # Для інтервалів без перетинів кінці теж відсортовані, тож
+        # достатньо префіксних сум з обрізанням крайніх інтервалів
+        if self.disjoint:
+            first = bisect_right(self.ends, window_start)
+            if first >= last:
+                return 0.0
+
+            busy = self._cumulative[last] - self._cumulative[first]
+            busy -= max(0.0, (window_start - self.starts[first]).total_seconds())
+            busy -= max(0.0, (self.ends[last - 1] - window_end).total_seconds())
+            return busy
+
+        busy = 0.0
+        covered_until = window_start
+        for index in range(last):
+            start = max(self.starts[index], covered_until)
+            end = min(self.ends[index], window_end)
+            if end > start:
+                busy += (end - start).total_seconds()
+                covered_until = end
+
+        return busy
+
+
+class ScheduleIndex:
+    """Кеш розкладів автобусів, що будуються з таблиці маршрутів при першому зверненні."""
+
+    def __init__(self):
+        self._schedules: Dict[int, BusSchedule] = {}
+        # Утримується на час перевірки та збереження нових маршрутів
+        self.lock = threading.RLock()
+
+    def schedules(self, db: Session, bus_ids: Iterable[int]) -> Dict[int, BusSchedule]:
+        """Розклади кількох автобусів; відсутні в кеші завантажуються одним запитом."""
+        bus_ids = set(bus_ids)
+
+        with self.lock:
+            missing = bus_ids - set(self._schedules)
+            if missing:
+                loaded = {bus_id: BusSchedule() for bus_id in missing}
+                for bus_id, route_id, departure_time, arrival_time in db.query(
+                    Route.bus_id, Route.id, Route.departure_time, Route.arrival_time
+                ).filter(Route.bus_id.in_(missing)).order_by(Route.departure_time):
+                    if departure_time is not None and arrival_time is not None:
+                        loaded[bus_id].add(departure_time, arrival_time, route_id)
+                self._schedules.update(loaded)
+
+            return {bus_id: self._schedules[bus_id] for bus_id in bus_ids}
+
+    def schedule(self, db: Session, bus_id: int) -> BusSchedule:
+        """Розклад одного автобуса."""
+        return self.schedules(db, [bus_id])[bus_id]
+
+    def invalidate(self, bus_id: Optional[int] = None):
+        """Скидання кешованого розкладу автобуса (або всіх)."""
+        with self.lock:
+            if bus_id is None:
+                self._schedules.clear()
+            else:
+                self._schedules.pop(bus_id, None)
+
+
+schedule_index = ScheduleIndex()
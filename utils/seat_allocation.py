@@ -0,0 +1,100 @@
+from functools import lru_cache
+from typing import Iterable, List, Optional
+
+# Схема салону за замовчуванням: 4 місця в ряду, прохід після другого
+DEFAULT_SEATS_PER_ROW = 4
+DEFAULT_AISLE_AFTER = 2
+
+
+class SeatLayout:
+    """Схема салону автобуса: місця нумеруються по рядах зліва направо.
+
+    Місце n відповідає біту n - 1 у бітовій масці зайнятості.
+    """
+
+    def __init__(self, capacity: int, seats_per_row: int, aisle_after: int):
+        self.capacity = capacity
+        self.seats_per_row = max(seats_per_row, 1)
+        # Прохід поза межами ряду означає, що ряд не розділений
+        self.aisle_after = aisle_after if 0 < aisle_after < self.seats_per_row else 0
+
+    @classmethod
+    def for_bus(cls, bus) -> "SeatLayout":
+        return cls(
+            bus.capacity,
+            bus.seats_per_row or DEFAULT_SEATS_PER_ROW,
+            bus.aisle_after if bus.aisle_after is not None else DEFAULT_AISLE_AFTER
+        )
+
+    def _side(self, column: int) -> int:
+        return 0 if not self.aisle_after or column < self.aisle_after else 1
+
+    def start_mask(self, count: int, scope: str) -> int:
+        """Маска позицій, з яких блок з `count` місць не перетинає межу.
+
+        scope: "side" — в межах однієї сторони від проходу,
+        "row" — в межах ряду, "any" — будь-який суцільний блок.
+        """
+        return _start_mask(self.capacity, self.seats_per_row, self.aisle_after, count, scope)
+
+
+@lru_cache(maxsize=1024)
+def _start_mask(capacity: int, seats_per_row: int, aisle_after: int, count: int, scope: str) -> int:
+    layout = SeatLayout(capacity, seats_per_row, aisle_after)
+    mask = 0
+    for start in range(0, capacity - count + 1):
+        end = start + count - 1
+        if scope != "any" and start // seats_per_row != end // seats_per_row:
+            continue
+        if scope == "side" and layout._side(start % seats_per_row) != layout._side(end % seats_per_row):
+            continue
+        mask |= 1 << start
+    return mask
+
+
+def occupancy_bitset(seats: Iterable[int]) -> int:
+    """Бітова маска зайнятих місць."""
+    bitset = 0
+    for seat_number in seats:
+        if seat_number >= 1:
+            bitset |= 1 << (seat_number - 1)
+    return bitset
+
+
+def _lowest_bit(mask: int) -> int:
+    return (mask & -mask).bit_length() - 1
+
+
+def allocate_seats(layout: SeatLayout, occupied: int, count: int, adjacent: bool) -> Optional[List[int]]:
+    """Вибір `count` вільних місць.
+
+    Спершу шукається суцільний блок з одного боку проходу, потім у межах
+    ряду, потім будь-який суцільний блок; береться найближчий до початку
+    салону. Якщо сусідні місця не обов'язкові, а блоку немає, повертаються
+    перші вільні місця. None — місць недостатньо.
+    """
+    if count <= 0 or count > layout.capacity:
+        return None
+
+    free = ((1 << layout.capacity) - 1) & ~occupied
+
+    # Біт p у runs означає, що місця p + 1 .. p + count вільні
+    runs = free
+    for shift in range(1, count):
+        runs &= free >> shift
+
+    for scope in ("side", "row", "any"):
+        candidates = runs & layout.start_mask(count, scope)
+        if candidates:
+            start = _lowest_bit(candidates)
+            return list(range(start + 1, start + count + 1))
+
+    if adjacent or bin(free).count("1") < count:
+        return None
+
+    seats = []
+    while len(seats) < count:
+        position = _lowest_bit(free)
+        seats.append(position + 1)
+        free &= free - 1
+    return seats
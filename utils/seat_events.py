@@ -0,0 +1,180 @@
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set, Tuple
+import asyncio
+import json
+
+from starlette.concurrency import run_in_threadpool
+
+# Розмір черги подій одного підписника; повільні підписники відключаються
+SUBSCRIBER_QUEUE_SIZE = 256
+
+# Інтервал повідомлень підтримки з'єднання (секунди)
+KEEPALIVE_SECONDS = 15
+
+SEAT_TAKEN = "seat-taken"
+SEAT_HELD = "seat-held"
+SEAT_FREED = "seat-freed"
+
+
+def _format_event(event: str, data: dict) -> str:
+    """Форматування повідомлення Server-Sent Events."""
+    return f"event: {event}\ndata: {json.dumps(data, default=lambda value: value.isoformat())}\n\n"
+
+
+class _Topic:
+    """Стан місць одного рейсу та його підписники."""
+
+    def __init__(self):
+        self.ready = asyncio.Event()
+        self.capacity = 0
+        self.taken: Set[int] = set()
+        self.holds: Dict[int, datetime] = {}
+        self.pending: List[tuple] = []
+        self.subscribers: Set[asyncio.Queue] = set()
+
+    def snapshot(self) -> str:
+        return _format_event("snapshot", {
+            "capacity": self.capacity,
+            "taken": sorted(self.taken),
+            "held": sorted(self.holds),
+        })
+
+
+class SeatEventHub:
+    """Розсилка змін доступності місць підписникам рейсу (route_id, travel_date).
+
+    Стан місць завантажується з БД один раз при появі першого підписника і
+    далі оновлюється подіями, тому кількість підписників не впливає на
+    кількість запитів до БД. Весь стан змінюється тільки в потоці циклу
+    подій; синхронні обробники передають події через `call_soon_threadsafe`.
+    """
+
+    def __init__(self):
+        self._topics: Dict[Tuple[int, datetime], _Topic] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def publish(
+        self,
+        route_id: int,
+        travel_date: datetime,
+        event: str,
+        seats: List[int],
+        expiry_time: Optional[datetime] = None,
+    ):
+        """Публікація події з будь-якого потоку."""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+
+        loop.call_soon_threadsafe(
+            self._apply, (route_id, travel_date), event, list(seats), expiry_time
+        )
+
+    def _apply(self, key, event: str, seats: List[int], expiry_time: Optional[datetime]):
+        topic = self._topics.get(key)
+        if topic is None:
+            return
+
+        # Подія надійшла під час завантаження знімка
+        if not topic.ready.is_set():
+            topic.pending.append((event, seats, expiry_time))
+            return
+
+        for seat_number in seats:
+            if event == SEAT_TAKEN:
+                topic.taken.add(seat_number)
+                topic.holds.pop(seat_number, None)
+            elif event == SEAT_HELD:
+                topic.holds[seat_number] = expiry_time
+            elif event == SEAT_FREED:
+                topic.taken.discard(seat_number)
+                topic.holds.pop(seat_number, None)
+
+        if event == SEAT_HELD and expiry_time is not None:
+            delay = max(0.0, (expiry_time - datetime.utcnow()).total_seconds())
+            self._loop.call_later(delay, self._expire, key, seats, expiry_time)
+
+        data = {"seats": seats}
+        if expiry_time is not None:
+            data["expiry_time"] = expiry_time
+        self._broadcast(topic, _format_event(event, data))
+
+    def _expire(self, key, seats: List[int], expiry_time: datetime):
+        """Звільнення місць, блокування яких закінчилось."""
+        topic = self._topics.get(key)
+        if topic is None:
+            return
+
+        expired = [
+            seat_number for seat_number in seats
+            if topic.holds.get(seat_number) == expiry_time
+        ]
+        if expired:
+            self._apply(key, SEAT_FREED, expired, None)
+
+    def _broadcast(self, topic: _Topic, message: str):
+        for subscriber in list(topic.subscribers):
+            try:
+                subscriber.put_nowait(message)
+            except asyncio.QueueFull:
+                # Підписник не встигає — відключаємо, після перепідключення він отримає знімок
+                topic.subscribers.discard(subscriber)
+                while not subscriber.empty():
+                    subscriber.get_nowait()
+                subscriber.put_nowait(None)
+
+    async def stream(
+        self,
+        route_id: int,
+        travel_date: datetime,
+        load_snapshot: Callable[[], Tuple[int, List[int], Dict[int, datetime]]],
+    ):
+        """Потік подій для одного підписника: спочатку знімок, далі зміни."""
+        self._loop = asyncio.get_running_loop()
+        key = (route_id, travel_date)
+
+        topic = self._topics.get(key)
+        if topic is None:
+            topic = _Topic()
+            self._topics[key] = topic
+            try:
+                capacity, taken, holds = await run_in_threadpool(load_snapshot)
+            except BaseException:
+                del self._topics[key]
+                topic.ready.set()
+                raise
+
+            topic.capacity = capacity
+            topic.taken = set(taken)
+            topic.holds = {}
+            topic.ready.set()
+            for seat_number, expiry_time in holds.items():
+                self._apply(key, SEAT_HELD, [seat_number], expiry_time)
+            pending, topic.pending = topic.pending, []
+            for event, seats, expiry_time in pending:
+                self._apply(key, event, seats, expiry_time)
+        else:
+            await topic.ready.wait()
+            if self._topics.get(key) is not topic:
+                return
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        topic.subscribers.add(queue)
+        try:
+            yield topic.snapshot()
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if message is None:
+                    break
+                yield message
+        finally:
+            topic.subscribers.discard(queue)
+            if not topic.subscribers and self._topics.get(key) is topic:
+                del self._topics[key]
+
+
+seat_event_hub = SeatEventHub()
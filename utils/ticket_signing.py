@@ -0,0 +1,67 @@
+from typing import Optional
+import base64
+import hashlib
+import hmac
+import json
+
+# Ключ підпису квитків; валідатори отримують його для перевірки без БД
+TICKET_SIGNING_KEY = "ваш_ключ_підпису_квитків"  # В реальному проекті зберігайте в .env файлі
+
+TOKEN_FIELDS = (
+    "ticket_number",
+    "route_id",
+    "travel_date",
+    "seat_number",
+    "departure_station",
+    "arrival_station",
+)
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _signature(payload: bytes) -> bytes:
+    return hmac.new(TICKET_SIGNING_KEY.encode("utf-8"), payload, hashlib.sha256).digest()
+
+
+def sign_ticket(ticket) -> str:
+    """Створення компактного підписаного токена квитка (HMAC-SHA256).
+
+    Токен має вигляд `<дані>.<підпис>`, де дані — JSON-масив полів
+    TOKEN_FIELDS у base64url.
+    """
+    payload = json.dumps(
+        [
+            ticket.ticket_number,
+            ticket.route_id,
+            ticket.travel_date.isoformat(),
+            ticket.seat_number,
+            ticket.departure_station,
+            ticket.arrival_station,
+        ],
+        separators=(",", ":"),
+        ensure_ascii=False,
+    ).encode("utf-8")
+
+    return f"{_b64encode(payload)}.{_b64encode(_signature(payload))}"
+
+
+def verify_ticket_token(token: str) -> Optional[dict]:
+    """Перевірка підпису токена. Повертає поля квитка або None."""
+    try:
+        encoded_payload, encoded_signature = token.split(".")
+        payload = _b64decode(encoded_payload)
+        signature = _b64decode(encoded_signature)
+    except ValueError:
+        return None
+
+    if not hmac.compare_digest(signature, _signature(payload)):
+        return None
+
+    values = json.loads(payload)
+    return dict(zip(TOKEN_FIELDS, values))